@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: how long a fresh process takes to import the app.
+
+Each scenario runs in a new interpreter, like a gunicorn worker boot or a
+helper script that calls ``create_app()``:
+
+- ``import app``: the current boot (no schema work, PDF/QR libraries lazy)
+- ``+ reportlab, qrcode``: what the first PDF/QR request adds, or what a
+  preloaded master pays once (GUNICORN_PRELOAD=1)
+- ``+ create_all``: the schema check the app used to run on every boot
+
+Uses DATABASE_URL (a throwaway SQLite file by default).
+
+Usage: python benchmark_startup.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SCENARIOS = [
+    ("import app", "import app"),
+    ("import app + reportlab, qrcode",
+     "import app; import reportlab.platypus, reportlab.lib.styles, qrcode.image.pil"),
+    ("import app + libs + create_all (old boot)",
+     "import app; import reportlab.platypus, reportlab.lib.styles, qrcode.image.pil\n"
+     "with app.app.app_context(): app.db.create_all()"),
+]
+
+TIMER = """
+import time
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+"""
+
+
+def run(code, env):
+    result = subprocess.run(
+        [sys.executable, "-c", TIMER.format(code=code)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    env = dict(os.environ)
+    with tempfile.TemporaryDirectory() as tmp:
+        env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp, 'startup.db')}")
+        # Create the schema once so create_all only inspects it, as on a real boot
+        run("import app\nwith app.app.app_context(): app.db.create_all()", env)
+
+        print(f"{'scenario':<44} {'median':>10} {'min':>10}   ({runs} runs)")
+        for label, code in SCENARIOS:
+            timings = [run(code, env) for _ in range(runs)]
+            print(f"{label:<44} {statistics.median(timings) * 1000:8.0f} ms {min(timings) * 1000:8.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: compiled Wi-Fi matcher vs. the old per-call query and parse.
+
+Creates an in-memory SQLite database with N active Wi-Fi networks, checks that
+both implementations agree on a set of random client IPs, then times them.
+
+Usage: python benchmark_wifi_matcher.py [networks] [lookups]
+"""
+
+import ipaddress
+import random
+import sys
+import time
+
+from flask import Flask
+
+from models import db, User, WiFiNetwork
+import wifi_matcher
+
+
+def legacy_is_on_configured_wifi(ip_str):
+    """The previous implementation: query all active networks and parse each one."""
+    if not ip_str:
+        return False, None
+
+    try:
+        client_ip = ipaddress.ip_address(ip_str)
+        if isinstance(client_ip, ipaddress.IPv6Address) and client_ip.ipv4_mapped:
+            client_ip = client_ip.ipv4_mapped
+    except Exception:
+        return False, None
+
+    active_networks = WiFiNetwork.query.filter_by(is_active=True).all()
+
+    for wifi_network in active_networks:
+        try:
+            router_ip = ipaddress.ip_address(wifi_network.router_ip)
+            if wifi_network.subnet_mask:
+                if wifi_network.subnet_mask.startswith('/'):
+                    network = ipaddress.ip_network(f"{wifi_network.router_ip}{wifi_network.subnet_mask}", strict=False)
+                else:
+                    network = ipaddress.ip_network(f"{wifi_network.router_ip}/{wifi_network.subnet_mask}", strict=False)
+                if client_ip.version == network.version and client_ip in network:
+                    return True, wifi_network
+            else:
+                if client_ip.version == router_ip.version:
+                    router_network = ipaddress.ip_network(f"{wifi_network.router_ip}/24", strict=False)
+                    if client_ip in router_network:
+                        return True, wifi_network
+        except Exception:
+            continue
+
+    return False, None
+
+
+def seed_networks(count):
+    admin = User(name="Benchmark", email="benchmark@example.com", password_hash="x", role="teacher")
+    db.session.add(admin)
+    db.session.flush()
+    masks = ["/24", "255.255.255.0", "/28", None, "/22", "/16"]
+    for i in range(count):
+        router_ip = f"10.{i // 250}.{i % 250}.1"
+        db.session.add(WiFiNetwork(
+            name=f"Network {i}",
+            router_ip=router_ip,
+            subnet_mask=masks[i % len(masks)],
+            is_active=i % 10 != 0,
+            created_by=admin.id,
+        ))
+    db.session.commit()
+
+
+def random_ips(count, networks):
+    rng = random.Random(42)
+    ips = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.6:
+            ips.append(f"10.{rng.randrange(networks // 250 + 1)}.{rng.randrange(256)}.{rng.randrange(256)}")
+        elif roll < 0.8:
+            ips.append(f"192.168.{rng.randrange(256)}.{rng.randrange(256)}")
+        elif roll < 0.9:
+            ips.append(f"::ffff:10.0.{rng.randrange(256)}.{rng.randrange(256)}")
+        else:
+            ips.append(f"2001:db8::{rng.randrange(65536):x}")
+    return ips
+
+
+def timed(label, func, ips):
+    start = time.perf_counter()
+    for ip in ips:
+        func(ip)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:10.1f} ms total {elapsed / len(ips) * 1e6:10.1f} us/lookup")
+    return elapsed
+
+
+def main():
+    networks = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        seed_networks(networks)
+        ips = random_ips(lookups, networks)
+
+        allowed = [ipaddress.ip_network("192.168.0.0/16")]
+        build_start = time.perf_counter()
+        matcher = wifi_matcher.NetworkMatcher(wifi_matcher.load_active_networks(), allowed)
+        print(f"Compiled {matcher.network_count} active networks in {(time.perf_counter() - build_start) * 1000:.1f} ms")
+
+        mismatches = 0
+        for ip in ips:
+            old_ok, old_network = legacy_is_on_configured_wifi(ip)
+            new_network = matcher.match(ip)[0]
+            if old_ok != (new_network is not None) or (old_ok and old_network.id != new_network.id):
+                mismatches += 1
+        print(f"Agreement check: {lookups - mismatches}/{lookups} lookups match")
+
+        legacy = timed("query + parse (old)", legacy_is_on_configured_wifi, ips[:max(1, lookups // 10)])
+        compiled = timed("compiled matcher", matcher.match, ips)
+        speedup = (legacy / max(1, lookups // 10)) / (compiled / lookups)
+        print(f"Speed-up per lookup: {speedup:,.0f}x")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Check the query budgets of the busiest routes with the Flask test client.
+
+Seeds a throwaway class, its teacher and students (as loadtest_scans.py does)
+plus an admin in DATABASE_URL, then runs each route in ``BUDGETS`` inside
+``sql_instrumentation.query_budget``. A budget does not depend on the class
+size, so a route that queries once per student fails as soon as
+``--students`` outgrows it. Seeded rows are removed at the end. Exits 1 if
+any route goes over its budget or errors.
+
+    python check_query_budgets.py --students 200
+"""
+
+import argparse
+import sys
+
+import login_guard
+import sql_instrumentation
+from loadtest_scans import PASSWORD, PREFIX, cleanup, new_session, seed
+
+# (description, who is logged in, method, path, most queries allowed); paths
+# are formatted with the seeded class id
+BUDGETS = [
+    ("QR scan", "student", "POST", "/mark_attendance", 8),
+    ("Admin class student list", "admin", "GET", "/admin/students/class/{class_id}", 6),
+]
+
+
+def seed_admin(app, class_id):
+    from models import db, User
+
+    with app.app_context():
+        admin = User(name="Query Budget Admin", email=f"{PREFIX}-admin-{class_id}@example.com",
+                     password_hash=login_guard.generate_password_hash(PASSWORD), role="admin")
+        db.session.add(admin)
+        db.session.commit()
+        return admin.id, admin.email
+
+
+def delete_user(app, user_id):
+    from models import db, User
+
+    with app.app_context():
+        User.query.filter_by(id=user_id).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def login(app, email):
+    client = app.test_client()
+    response = client.post("/login", data={"email": email, "password": PASSWORD})
+    if response.status_code != 302:
+        raise RuntimeError(f"Login failed for {email}")
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check per-route query budgets.")
+    parser.add_argument("--students", type=int, default=50)
+    args = parser.parse_args()
+
+    from app import app
+
+    class_id, _, emails = seed(app, args.students)
+    admin_id, admin_email = seed_admin(app, class_id)
+    failures = 0
+    try:
+        qr_data = new_session(app, class_id)
+        clients = {"student": login(app, emails[0]), "admin": login(app, admin_email)}
+        print(f"🔍 Checking query budgets with {args.students} students")
+
+        for description, role, method, path, budget in BUDGETS:
+            path = path.format(class_id=class_id)
+            kwargs = {"json": {"qr_data": qr_data}} if method == "POST" else {}
+            try:
+                with sql_instrumentation.query_budget(app, budget) as log:
+                    response = clients[role].open(path, method=method, **kwargs)
+            except sql_instrumentation.QueryBudgetExceeded as e:
+                failures += 1
+                print(f"❌ {description} ({method} {path}): {e}")
+                continue
+            if response.status_code >= 400:
+                failures += 1
+                print(f"❌ {description} ({method} {path}): HTTP {response.status_code}")
+                continue
+            print(f"✅ {description}: {log.count} queries (budget {budget})")
+    finally:
+        delete_user(app, admin_id)
+        cleanup(app, class_id)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,405 @@
+"""
+Streaming CSV import helpers for bulk student and password uploads.
+
+Uploads are read incrementally from the uploaded file stream and processed in
+fixed-size row chunks, committing once per chunk. Memory use therefore depends
+on the batch size rather than on the size of the file, and an import that stops
+on a failed chunk can be resumed from the first row of that chunk.
+"""
+
+import csv
+import io
+import random
+import re
+import string
+
+from login_guard import generate_password_hash
+from models import db, User, ClassModel, PasswordLog
+
+STUDENT_REQUIRED_COLUMNS = ['name', 'email', 'roll_number', 'class_name']
+
+# Rows processed (and committed) per chunk unless overridden
+DEFAULT_BATCH_SIZE = 500
+
+# Only the first few row errors are kept in memory for reporting
+DEFAULT_MAX_ERRORS = 100
+
+# The header is line 1, so the first data row is row 2
+FIRST_DATA_ROW = 2
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+class CSVFormatError(ValueError):
+    """Raised when an uploaded CSV cannot be imported at all (bad header, encoding)."""
+
+
+def generate_password(length=8):
+    """Generate a random alphanumeric password."""
+    characters = string.ascii_letters + string.digits
+    return ''.join(random.choice(characters) for _ in range(length))
+
+
+def parse_batch_size(value, default=DEFAULT_BATCH_SIZE):
+    """Parse a user-supplied batch size, falling back to the default."""
+    try:
+        batch_size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return batch_size if batch_size > 0 else default
+
+
+def parse_start_row(value):
+    """Parse a user-supplied resume row, falling back to the first data row."""
+    try:
+        start_row = int(value)
+    except (TypeError, ValueError):
+        return FIRST_DATA_ROW
+    return max(start_row, FIRST_DATA_ROW)
+
+
+def open_csv_reader(stream, required_columns=()):
+    """Wrap a binary upload stream in a lazily-decoding ``csv.DictReader``.
+
+    Only the header line is read here. Raises ``CSVFormatError`` if the header
+    is missing, tab-separated or lacks any of ``required_columns``.
+    """
+    stream.seek(0)
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    reader = csv.DictReader(text_stream)
+
+    try:
+        fieldnames = reader.fieldnames
+    except UnicodeDecodeError as e:
+        raise CSVFormatError(f'File is not valid UTF-8: {e}')
+
+    if not fieldnames:
+        raise CSVFormatError('CSV file is empty.')
+
+    # A tab-separated header means the whole file uses tabs
+    if any('\t' in (name or '') for name in fieldnames):
+        raise CSVFormatError('CSV file contains tab characters. Please use commas to separate columns.')
+
+    missing_columns = [col for col in required_columns if col not in fieldnames]
+    if missing_columns:
+        raise CSVFormatError(f'Missing required columns: {", ".join(missing_columns)}')
+
+    return reader
+
+
+def iter_row_chunks(reader, batch_size=DEFAULT_BATCH_SIZE, start_row=FIRST_DATA_ROW):
+    """Yield lists of ``(row_num, row)`` of at most ``batch_size`` rows.
+
+    Rows before ``start_row`` are skipped without being kept, which is how a
+    previously interrupted import is resumed.
+    """
+    chunk = []
+    for row_num, row in enumerate(reader, start=FIRST_DATA_ROW):
+        if row_num < start_row:
+            continue
+        chunk.append((row_num, row))
+        if len(chunk) >= batch_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ImportResult:
+    """Running totals for one import, passed to progress callbacks after each chunk.
+
+    ``on_error(row_num, row, message)`` is called for every rejected row, so
+    callers can stream all error rows somewhere while only the first
+    ``max_errors`` messages are kept in memory (all of them if ``None``).
+    """
+
+    def __init__(self, start_row=FIRST_DATA_ROW, max_errors=DEFAULT_MAX_ERRORS, on_error=None):
+        self.processed = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.last_committed_row = start_row - 1
+        self.resume_row = None
+        self.stop_reason = None
+        self.max_errors = max_errors
+        self.on_error = on_error
+
+    def record_error(self, row_num, row, message):
+        self.failed += 1
+        if self.max_errors is None or len(self.errors) < self.max_errors:
+            self.errors.append((row_num, message))
+        if self.on_error:
+            self.on_error(row_num, row, message)
+
+    def commit_chunk(self, chunk, pending):
+        """Commit one chunk; on failure roll back and mark where to resume."""
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self.failed += pending
+            self.resume_row = chunk[0][0]
+            self.stop_reason = str(e)
+            return False
+        self.imported += pending
+        self.last_committed_row = chunk[-1][0]
+        return True
+
+
+def _password_log(user, action, method, notes, log_context):
+    return PasswordLog(
+        user=user,
+        admin_id=log_context['admin_id'],
+        action=action,
+        method=method,
+        ip_address=log_context.get('ip_address'),
+        user_agent=log_context.get('user_agent'),
+        notes=notes
+    )
+
+
+def _check_student_row(row, classes, validate_email):
+    """Return the cleaned required fields of ``row`` and the problems found in them.
+
+    Shared by ``validate_students`` and ``import_students`` so a dry run
+    rejects exactly the rows the import would.
+    """
+    fields = (
+        (row.get('name') or '').strip(),
+        (row.get('email') or '').strip().lower(),
+        (row.get('roll_number') or '').strip(),
+        (row.get('class_name') or '').strip(),
+    )
+    name, email, roll_number, class_name = fields
+    problems = []
+
+    missing = [col for col, value in zip(STUDENT_REQUIRED_COLUMNS, fields) if not value]
+    if missing:
+        problems.append(f'Missing {", ".join(missing)}')
+
+    if any('\t' in value for value in fields):
+        problems.append('Contains tab characters - use commas instead')
+
+    if email and validate_email and not EMAIL_PATTERN.match(email):
+        problems.append(f'Invalid email format - {email}')
+
+    if class_name and class_name not in classes:
+        problems.append(f"Class '{class_name}' does not exist")
+
+    return fields, problems
+
+
+def validate_students(reader, validate_email=True, start_row=FIRST_DATA_ROW, on_error=None):
+    """Dry run of ``import_students``: report every invalid row, write nothing.
+
+    Existing emails, (roll number, class) pairs and class names are fetched
+    once up front, so the whole file is checked in one pass with set lookups
+    and no per-row queries. Every problem of a row is reported together.
+    """
+    result = ImportResult(start_row, max_errors=None, on_error=on_error)
+    classes = dict(db.session.query(ClassModel.name, ClassModel.id).all())
+    existing_emails = {email for (email,) in db.session.query(User.email)}
+    existing_rolls = {
+        (roll_number, class_id)
+        for roll_number, class_id in db.session.query(User.roll_number, User.class_id).filter(
+            User.roll_number.isnot(None)
+        )
+    }
+    # First row each email / (roll number, class) appears on in this file
+    file_emails = {}
+    file_rolls = {}
+
+    for row_num, row in enumerate(reader, start=FIRST_DATA_ROW):
+        if row_num < start_row:
+            continue
+        result.processed += 1
+
+        (name, email, roll_number, class_name), problems = _check_student_row(row, classes, validate_email)
+
+        if email:
+            if email in existing_emails:
+                problems.append(f"Email '{email}' already exists")
+            elif email in file_emails:
+                problems.append(f"Email '{email}' repeats row {file_emails[email]}")
+            else:
+                file_emails[email] = row_num
+
+        class_id = classes.get(class_name)
+        if roll_number and class_id is not None:
+            key = (roll_number, class_id)
+            if key in existing_rolls:
+                problems.append(f"Roll number '{roll_number}' already exists in class '{class_name}'")
+            elif key in file_rolls:
+                problems.append(f"Roll number '{roll_number}' repeats row {file_rolls[key]}")
+            else:
+                file_rolls[key] = row_num
+
+        if problems:
+            result.record_error(row_num, row, '; '.join(problems))
+
+    return result
+
+
+def import_students(reader, default_password='', batch_size=DEFAULT_BATCH_SIZE,
+                    start_row=FIRST_DATA_ROW, log_context=None, use_password_column=True,
+                    validate_email=False, max_errors=DEFAULT_MAX_ERRORS, on_error=None,
+                    on_progress=None):
+    """Import students from ``reader`` chunk by chunk.
+
+    Each chunk costs two lookup queries (existing emails and roll numbers) and
+    one commit. When ``log_context`` (``admin_id``, ``ip_address``,
+    ``user_agent``) is given a ``PasswordLog`` entry is written per student.
+    Returns an ``ImportResult``; ``resume_row`` is set if a chunk failed to
+    commit. ``on_progress(result)`` is called after every chunk.
+    """
+    result = ImportResult(start_row, max_errors, on_error)
+    classes = dict(db.session.query(ClassModel.name, ClassModel.id).all())
+    has_password_column = use_password_column and 'password' in reader.fieldnames
+
+    for chunk in iter_row_chunks(reader, batch_size, start_row):
+        result.processed += len(chunk)
+        parsed = []
+
+        for row_num, row in chunk:
+            (name, email, roll_number, class_name), problems = _check_student_row(row, classes, validate_email)
+            if problems:
+                result.record_error(row_num, row, '; '.join(problems))
+                continue
+
+            csv_password = (row.get('password') or '').strip() if has_password_column else ''
+            parsed.append((row_num, row, name, email, roll_number, class_name, csv_password))
+
+        saved = not parsed or _save_student_chunk(result, chunk, parsed, classes, default_password, log_context)
+        if on_progress:
+            on_progress(result)
+        if not saved:
+            break
+
+    return result
+
+
+def _save_student_chunk(result, chunk, parsed, classes, default_password, log_context):
+    """Create the validated students of one chunk and commit them."""
+    # Prefetch duplicates for the whole chunk instead of querying per row
+    chunk_emails = {p[3] for p in parsed}
+    existing_emails = {
+        email for (email,) in db.session.query(User.email).filter(User.email.in_(chunk_emails))
+    }
+    chunk_rolls = {p[4] for p in parsed}
+    chunk_class_ids = {classes[p[5]] for p in parsed}
+    existing_rolls = {
+        (roll_number, class_id)
+        for roll_number, class_id in db.session.query(User.roll_number, User.class_id).filter(
+            User.roll_number.in_(chunk_rolls),
+            User.class_id.in_(chunk_class_ids)
+        )
+    }
+
+    pending = 0
+    for row_num, row, name, email, roll_number, class_name, csv_password in parsed:
+        class_id = classes[class_name]
+
+        if email in existing_emails:
+            result.record_error(row_num, row, f"Email '{email}' already exists")
+            continue
+
+        if (roll_number, class_id) in existing_rolls:
+            result.record_error(row_num, row,
+                                f"Roll number '{roll_number}' already exists in class '{class_name}'")
+            continue
+
+        if csv_password:
+            password = csv_password
+            method = 'bulk_upload'
+        else:
+            password = default_password if default_password else generate_password()
+            method = 'bulk_upload' if default_password else 'auto_generated'
+
+        user = User(
+            name=name,
+            email=email,
+            password_hash=generate_password_hash(password),
+            role='student',
+            roll_number=roll_number,
+            class_id=class_id,
+            status='Active',
+            is_active=True
+        )
+        db.session.add(user)
+        if log_context:
+            db.session.add(_password_log(user, 'created', method, 'Bulk upload - student account created', log_context))
+
+        # Later rows in the same file must see earlier ones as duplicates
+        existing_emails.add(email)
+        existing_rolls.add((roll_number, class_id))
+        pending += 1
+
+    return result.commit_chunk(chunk, pending) if pending else True
+
+
+def import_passwords(reader, password_column='password', auto_generate_missing=False,
+                     default_password='', batch_size=DEFAULT_BATCH_SIZE, start_row=FIRST_DATA_ROW,
+                     log_context=None, max_errors=DEFAULT_MAX_ERRORS, on_error=None,
+                     on_progress=None):
+    """Update user passwords from ``reader`` chunk by chunk.
+
+    Users for a chunk are fetched with a single ``IN`` query and the chunk is
+    committed together with its ``PasswordLog`` entries.
+    """
+    result = ImportResult(start_row, max_errors, on_error)
+
+    for chunk in iter_row_chunks(reader, batch_size, start_row):
+        result.processed += len(chunk)
+        parsed = []
+
+        for row_num, row in chunk:
+            email = (row.get('email') or '').strip().lower()
+            password = (row.get(password_column) or '').strip()
+            if not email:
+                result.record_error(row_num, row, 'Missing email')
+                continue
+            parsed.append((row_num, row, email, password))
+
+        saved = not parsed or _save_password_chunk(result, chunk, parsed, auto_generate_missing,
+                                                   default_password, log_context)
+        if on_progress:
+            on_progress(result)
+        if not saved:
+            break
+
+    return result
+
+
+def _save_password_chunk(result, chunk, parsed, auto_generate_missing, default_password, log_context):
+    """Apply the password updates of one chunk and commit them."""
+    users = {
+        user.email: user
+        for user in User.query.filter(User.email.in_({p[2] for p in parsed}))
+    }
+
+    pending = 0
+    for row_num, row, email, password in parsed:
+        user = users.get(email)
+        if not user:
+            result.record_error(row_num, row, f"User '{email}' not found")
+            continue
+
+        if password:
+            new_password = password
+            method = 'bulk_upload'
+        elif auto_generate_missing:
+            new_password = generate_password()
+            method = 'auto_generated'
+        elif default_password:
+            new_password = default_password
+            method = 'bulk_upload'
+        else:
+            result.record_error(row_num, row, 'No password provided')
+            continue
+
+        user.password_hash = generate_password_hash(new_password)
+        if log_context:
+            db.session.add(_password_log(user, 'updated', method, 'Bulk upload - password updated', log_context))
+        pending += 1
+
+    return result.commit_chunk(chunk, pending) if pending else True
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Synthetic institution generator for scale testing.
+
+Builds a complete institution in the configured database:
+- departments, each with several branches
+- the 8 semesters, and per branch and semester enough divisions (classes)
+  to hold the students
+- teachers assigned to each class, plus an admin, one HOD per department
+  and a principal
+- students, and a term of weekday lectures per class
+- attendance rows with realistic gaps. Each student has their own habit
+  (most attend regularly, a minority often skip, a few are chronically
+  absent). On top of that: fewer students on Mondays, Fridays and in the
+  first and last lecture of the day, a slow decline over the term,
+  illness streaks of a few days, and the odd half-empty lecture.
+
+    python generate_institution.py --plan                 # counts only
+    python generate_institution.py                        # 50k students, 16 weeks
+    python generate_institution.py --students 5000 --weeks 4 --seed 7
+
+Rows are loaded with COPY on PostgreSQL (multi-row INSERTs elsewhere), so
+the default dataset (~250k sessions, ~12M attendance rows) is ready in
+minutes rather than hours. Everything is written in one transaction, and
+generated accounts use ``--domain`` emails, so a second run into the same
+database stops instead of duplicating data; start over with
+reset_database.py. All generated accounts share ``--password``.
+"""
+
+import argparse
+import csv
+import io
+import math
+import random
+import time
+import uuid
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+
+from sqlalchemy import select, text
+
+from db_engine import create_db_engine, get_database_url, is_postgres
+import login_guard
+from models import User, Department, Branch, Semester, ClassModel, TeacherClass, SessionModel, Attendance
+import partitions
+
+DEPARTMENTS = [
+    ("Computer Science and Engineering", "CSE"),
+    ("Information Technology", "IT"),
+    ("Electronics and Communication", "EC"),
+    ("Electrical Engineering", "EE"),
+    ("Mechanical Engineering", "ME"),
+    ("Civil Engineering", "CV"),
+    ("Chemical Engineering", "CH"),
+    ("Biotechnology", "BT"),
+    ("Instrumentation and Control", "IC"),
+    ("Automobile Engineering", "AU"),
+]
+FIRST_NAMES = [
+    "Aarav", "Aditi", "Akash", "Ananya", "Arjun", "Bhavya", "Chirag", "Diya", "Dev", "Esha",
+    "Gaurav", "Hetal", "Ishaan", "Janvi", "Karan", "Kavya", "Krish", "Meera", "Mihir", "Neha",
+    "Nikhil", "Pooja", "Pranav", "Priya", "Rahul", "Riya", "Rohan", "Sakshi", "Sanjay", "Shreya",
+    "Siddharth", "Sneha", "Tanvi", "Tushar", "Urvi", "Varun", "Vidhi", "Yash", "Zara", "Om",
+]
+LAST_NAMES = [
+    "Patel", "Shah", "Mehta", "Desai", "Joshi", "Trivedi", "Pandya", "Parikh", "Modi", "Bhatt",
+    "Sharma", "Verma", "Gupta", "Singh", "Kumar", "Iyer", "Nair", "Reddy", "Rao", "Das",
+    "Chauhan", "Solanki", "Vyas", "Thakkar", "Rana", "Jain", "Kapoor", "Malhotra", "Sinha", "Bose",
+]
+DIVISIONS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# Attendance model: share of students in each habit group and its mean/spread
+HABITS = [(0.85, 0.88, 0.06), (0.10, 0.65, 0.10), (0.05, 0.35, 0.12)]
+WEEKDAY_FACTOR = {0: 0.94, 1: 1.0, 2: 1.0, 3: 0.98, 4: 0.90}
+FIRST_SLOT_FACTOR = 0.93
+LAST_SLOT_FACTOR = 0.92
+TERM_DECLINE = 0.10           # attendance drops by this share from first to last week
+ILLNESS_START = 0.008         # chance per student per teaching day of falling ill
+ILLNESS_DAYS = (1, 4)
+HALF_EMPTY_LECTURE = 0.01     # share of lectures only ~30% of the class attends
+CANCELLED_LECTURE = 0.03
+PROXY_LECTURE = 0.02
+
+COPY_CHUNK_ROWS = 200000
+INSERT_CHUNK_ROWS = 5000
+
+
+class BulkLoader:
+    """Writes rows with COPY on PostgreSQL and multi-row INSERTs elsewhere."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.postgres = conn.dialect.name == "postgresql"
+
+    def load(self, table, columns, rows):
+        """Insert an iterable of tuples into ``table``; return the row count."""
+        count = 0
+        chunk = []
+        chunk_size = COPY_CHUNK_ROWS if self.postgres else INSERT_CHUNK_ROWS
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                count += self._flush(table, columns, chunk)
+                chunk = []
+        if chunk:
+            count += self._flush(table, columns, chunk)
+        return count
+
+    def _flush(self, table, columns, chunk):
+        if self.postgres:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in chunk:
+                writer.writerow("" if value is None else value for value in row)
+            buffer.seek(0)
+            cursor = self.conn.connection.cursor()
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        else:
+            # executemany; SQLAlchemy batches it into multi-row INSERT ... VALUES statements
+            self.conn.execute(table.insert(), [dict(zip(columns, row)) for row in chunk])
+        return len(chunk)
+
+
+def teaching_days(term_end, weeks, holidays, rng):
+    """Weekdays of the ``weeks`` weeks ending on ``term_end``, minus random holidays."""
+    start = term_end - timedelta(weeks=weeks) + timedelta(days=1)
+    days = [start + timedelta(days=offset) for offset in range((term_end - start).days + 1)]
+    days = [day for day in days if day.weekday() < 5]
+    for day in rng.sample(days, min(holidays, len(days))):
+        days.remove(day)
+    return days
+
+
+def plan(args):
+    """Derived sizes of the institution."""
+    departments = min(args.departments, len(DEPARTMENTS))
+    groups = departments * args.branches_per_department * 8
+    divisions = max(1, math.ceil(args.students / (groups * args.class_size)))
+    if divisions > len(DIVISIONS):
+        raise SystemExit(f"❌ {divisions} divisions per semester needed; raise --class-size or --branches-per-department")
+    classes = groups * divisions
+    teachers = args.teachers or max(args.subjects, math.ceil(classes * args.subjects / 4))
+    lectures = classes * args.lectures_per_day * (args.weeks * 5 - args.holidays)
+    return {
+        "departments": departments,
+        "branches": departments * args.branches_per_department,
+        "divisions": divisions,
+        "classes": classes,
+        "teachers": teachers,
+        "students": args.students,
+        "sessions": int(lectures * (1 - CANCELLED_LECTURE)),
+        "attendance": int(lectures * (1 - CANCELLED_LECTURE) * args.students / classes * 0.8),
+    }
+
+
+def random_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def get_or_create(conn, table, match, values):
+    """Id of the row matching ``match``, inserting ``values`` if there is none."""
+    query = select(table.c.id)
+    for column, value in match.items():
+        query = query.where(table.c[column] == value)
+    existing = conn.execute(query).scalar()
+    if existing is not None:
+        return existing
+    return conn.execute(table.insert().values(**values).returning(table.c.id)).scalar()
+
+
+def create_structure(conn, args, sizes, now):
+    """Departments, branches, semesters and classes; return (department ids, class list)."""
+    departments, branches, semesters = Department.__table__, Branch.__table__, Semester.__table__
+    classes = ClassModel.__table__
+    semester_ids = {
+        number: get_or_create(conn, semesters, {"number": number},
+                              {"number": number, "name": f"Semester {number}", "is_active": True, "created_at": now})
+        for number in range(1, 9)
+    }
+    department_ids = []
+    class_list = []  # (class id, semester number, branch code, department id)
+    for name, code in DEPARTMENTS[:sizes["departments"]]:
+        department_id = get_or_create(conn, departments, {"code": code},
+                                      {"name": name, "code": code, "created_at": now})
+        department_ids.append(department_id)
+        for branch_number in range(1, args.branches_per_department + 1):
+            branch_code = f"{code}{branch_number}"
+            branch_id = get_or_create(conn, branches, {"code": branch_code, "department_id": department_id},
+                                      {"name": f"{name} {branch_number}", "code": branch_code,
+                                       "department_id": department_id, "created_at": now})
+            for semester in range(1, 9):
+                for division in DIVISIONS[:sizes["divisions"]]:
+                    class_name = f"{semester}{branch_code}{division}"
+                    class_id = get_or_create(conn, classes, {"name": class_name}, {
+                        "name": class_name, "division": division, "semester_id": semester_ids[semester],
+                        "branch_id": branch_id, "created_at": now,
+                    })
+                    class_list.append((class_id, semester, branch_code, department_id))
+    return department_ids, class_list
+
+
+def user_ids_by_email(conn, domain, role):
+    users = User.__table__
+    rows = conn.execute(select(users.c.id, users.c.email, users.c.class_id).where(
+        users.c.role == role, users.c.email.like(f"%@{domain}")
+    ))
+    return {email: (user_id, class_id) for user_id, email, class_id in rows}
+
+
+def create_staff(loader, conn, args, sizes, department_ids, class_list, password_hash, now, rng):
+    """Admin, HODs, principal and teachers; assign teachers to classes. Return teacher ids per class."""
+    users = User.__table__
+    columns = ("name", "email", "password_hash", "role", "department_id", "is_active", "created_at")
+    staff = [("Synthetic Admin", f"admin@{args.domain}", password_hash, "admin", None, True, now),
+             ("Synthetic Principal", f"principal@{args.domain}", password_hash, "principal", None, True, now)]
+    staff += [(random_name(rng), f"hod{index}@{args.domain}", password_hash, "hod", department_id, True, now)
+              for index, department_id in enumerate(department_ids, start=1)]
+    staff += [(random_name(rng), f"teacher{index:05d}@{args.domain}", password_hash, "teacher", None, True, now)
+              for index in range(1, sizes["teachers"] + 1)]
+    loader.load(users, columns, staff)
+
+    teachers = [user_id for user_id, _ in user_ids_by_email(conn, args.domain, "teacher").values()]
+    rng.shuffle(teachers)
+    # Consecutive slots of the shuffled pool: a class never gets the same teacher twice
+    class_teachers = {}
+    assignments = []
+    for index, (class_id, _, _, _) in enumerate(class_list):
+        assigned = [teachers[(index * args.subjects + subject) % len(teachers)] for subject in range(args.subjects)]
+        class_teachers[class_id] = assigned
+        assignments += [(teacher_id, class_id, now) for teacher_id in assigned]
+    loader.load(TeacherClass.__table__, ("teacher_id", "class_id", "created_at"), assignments)
+    return class_teachers
+
+
+def create_students(loader, conn, args, class_list, password_hash, now, rng):
+    """Students spread evenly over the classes; return student ids per class."""
+    columns = ("name", "email", "password_hash", "role", "roll_number", "class_id", "status", "is_active", "created_at")
+    admission_year = now.year % 100
+
+    def rows():
+        for index in range(args.students):
+            class_id, semester, branch_code, _ = class_list[index % len(class_list)]
+            year = (admission_year - (semester - 1) // 2) % 100
+            yield (random_name(rng), f"student{index + 1:06d}@{args.domain}", password_hash, "student",
+                   f"{year:02d}{branch_code}{index + 1:06d}", class_id, "Active", True, now)
+
+    loader.load(User.__table__, columns, rows())
+    students = {}
+    for user_id, class_id in user_ids_by_email(conn, args.domain, "student").values():
+        students.setdefault(class_id, []).append(user_id)
+    return students
+
+
+def create_sessions(loader, conn, args, days, class_teachers, now, rng):
+    """A term of lectures per class; return {class id: [(session id, created_at, day index, slot)]}."""
+    columns = ("session_uuid", "expiry", "created_at", "class_id", "teacher_id", "is_locked",
+               "qr_expiry_seconds", "is_proxy", "proxy_teacher_name")
+    planned = {}  # session uuid -> (class id, created_at, day index, slot)
+
+    def rows():
+        for class_id, teachers in class_teachers.items():
+            for day_index, day in enumerate(days):
+                for slot in range(args.lectures_per_day):
+                    if rng.random() < CANCELLED_LECTURE:
+                        continue
+                    start = datetime.combine(day, dt_time(args.first_lecture_hour + slot), tzinfo=timezone.utc)
+                    created_at = start + timedelta(minutes=rng.randint(0, 10), seconds=rng.randint(0, 59))
+                    if created_at > now:
+                        continue
+                    session_uuid = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+                    planned[session_uuid] = (class_id, created_at, day_index, slot)
+                    proxy = rng.random() < PROXY_LECTURE
+                    yield (session_uuid, created_at + timedelta(seconds=30), created_at, class_id,
+                           teachers[(day_index + slot) % len(teachers)], created_at < now - timedelta(hours=1),
+                           30, proxy, random_name(rng) if proxy else None)
+
+    loader.load(SessionModel.__table__, columns, rows())
+    sessions_table = SessionModel.__table__
+    by_class = {}
+    for session_id, session_uuid in conn.execute(select(sessions_table.c.id, sessions_table.c.session_uuid)):
+        if session_uuid in planned:
+            class_id, created_at, day_index, slot = planned[session_uuid]
+            by_class.setdefault(class_id, []).append((session_id, created_at, day_index, slot))
+    for sessions in by_class.values():
+        sessions.sort(key=lambda session: session[1])
+    return by_class
+
+
+def student_habit(rng):
+    share = rng.random()
+    for weight, mean, spread in HABITS:
+        if share < weight:
+            return min(0.99, max(0.05, rng.gauss(mean, spread)))
+        share -= weight
+    return HABITS[-1][1]
+
+
+def attendance_rows(args, days, students, sessions_by_class, rng):
+    """Yield attendance rows following the model described at the top of this file."""
+    last_slot = args.lectures_per_day - 1
+    day_factor = [
+        WEEKDAY_FACTOR[day.weekday()] * (1 - TERM_DECLINE * index / max(1, len(days) - 1))
+        for index, day in enumerate(days)
+    ]
+    for class_id, sessions in sessions_by_class.items():
+        half_empty = {session_id for session_id, _, _, _ in sessions if rng.random() < HALF_EMPTY_LECTURE}
+        for user_id in students.get(class_id, []):
+            habit = student_habit(rng)
+            ill_until = -1
+            last_day = -1
+            subnet = rng.randint(0, 255)
+            for session_id, created_at, day_index, slot in sessions:
+                if day_index != last_day:
+                    last_day = day_index
+                    if day_index > ill_until and rng.random() < ILLNESS_START:
+                        ill_until = day_index + rng.randint(*ILLNESS_DAYS) - 1
+                if day_index <= ill_until:
+                    continue
+                chance = habit * day_factor[day_index]
+                if slot == 0:
+                    chance *= FIRST_SLOT_FACTOR
+                elif slot == last_slot:
+                    chance *= LAST_SLOT_FACTOR
+                if session_id in half_empty:
+                    chance *= 0.3
+                if rng.random() < chance:
+                    yield (user_id, session_id, created_at, created_at + timedelta(seconds=rng.randint(2, 28)),
+                           f"192.168.{subnet}.{rng.randint(2, 254)}")
+
+
+def ensure_term_partitions(conn, days):
+    """Monthly partitions covering the term, when the attendance tables are partitioned."""
+    created = []
+    for table in partitions.PARTITIONED_TABLES:
+        if not partitions.is_partitioned(conn, table):
+            continue
+        existing = partitions.month_partitions(conn, table)
+        first = partitions.month_start(datetime.combine(days[0], dt_time(), tzinfo=timezone.utc))
+        last = partitions.month_start(datetime.combine(days[-1], dt_time(), tzinfo=timezone.utc))
+        for month in partitions.month_range(first, last):
+            if month not in existing:
+                created.append(partitions.create_month_partition(conn, table, month))
+    return created
+
+
+def generate(args):
+    sizes = plan(args)
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    days = teaching_days(args.term_end or now.date(), args.weeks, args.holidays, rng)
+    if not days:
+        raise SystemExit("❌ The term has no teaching days")
+
+    # Bulk loads and ANALYZE outlast the app's DB_STATEMENT_TIMEOUT_MS
+    engine = create_db_engine(statement_timeout_ms=0)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT 1 FROM users WHERE email LIKE :pattern LIMIT 1"),
+                        {"pattern": f"%@{args.domain}"}).fetchone():
+            raise SystemExit(f"❌ Accounts @{args.domain} already exist. Run reset_database.py or pick another --domain.")
+        loader = BulkLoader(conn)
+        password_hash = login_guard.generate_password_hash(args.password)
+
+        def step(message, function, *step_args):
+            step_started = time.perf_counter()
+            print(f"🏗️  {message}...", flush=True)
+            result = function(*step_args)
+            print(f"   done in {time.perf_counter() - step_started:.1f}s", flush=True)
+            return result
+
+        department_ids, class_list = step(
+            f"Structure: {sizes['departments']} departments, {sizes['branches']} branches, {sizes['classes']} classes",
+            create_structure, conn, args, sizes, now)
+        class_teachers = step(f"Staff: {sizes['teachers']} teachers, HODs, principal, admin",
+                              create_staff, loader, conn, args, sizes, department_ids, class_list,
+                              password_hash, now, rng)
+        students = step(f"Students: {args.students}", create_students, loader, conn, args, class_list,
+                        password_hash, now, rng)
+        sessions_by_class = step(f"Sessions: {len(days)} teaching days from {days[0]} to {days[-1]}",
+                                 create_sessions, loader, conn, args, days, class_teachers, now, rng)
+        session_count = sum(len(sessions) for sessions in sessions_by_class.values())
+        if is_postgres(get_database_url()):
+            for name in ensure_term_partitions(conn, days):
+                print(f"   ➕ {name}")
+        attendance_count = step(
+            f"Attendance for {session_count} sessions",
+            loader.load, Attendance.__table__,
+            ("user_id", "session_id", "session_created_at", "timestamp", "client_ip"),
+            attendance_rows(args, days, students, sessions_by_class, rng))
+        if loader.postgres:
+            step("ANALYZE", lambda: [conn.execute(text(f"ANALYZE {table}"))
+                                     for table in ("users", "classes", "teacher_classes", "sessions", "attendance")])
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {args.students} students, {session_count} sessions and {attendance_count} attendance rows "
+          f"in {elapsed:.0f}s")
+    print(f"   Log in as admin@{args.domain}, principal@{args.domain}, hod1@{args.domain}, "
+          f"teacher00001@{args.domain} or student000001@{args.domain} with password '{args.password}'")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic institution for scale testing.")
+    parser.add_argument("--students", type=int, default=50000)
+    parser.add_argument("--class-size", type=int, default=60, help="target students per class")
+    parser.add_argument("--departments", type=int, default=6, help=f"at most {len(DEPARTMENTS)}")
+    parser.add_argument("--branches-per-department", type=int, default=2)
+    parser.add_argument("--subjects", type=int, default=5, help="teachers assigned to each class")
+    parser.add_argument("--teachers", type=int, default=0, help="default: enough for ~4 class-subjects each")
+    parser.add_argument("--weeks", type=int, default=16, help="length of the term")
+    parser.add_argument("--term-end", type=date.fromisoformat, help="last day of the term (default today)")
+    parser.add_argument("--holidays", type=int, default=5, help="weekdays without lectures")
+    parser.add_argument("--lectures-per-day", type=int, default=4)
+    parser.add_argument("--first-lecture-hour", type=int, default=4, help="UTC hour of the first lecture")
+    parser.add_argument("--domain", default="synthetic.example.edu", help="email domain of generated accounts")
+    parser.add_argument("--password", default="synthetic123", help="password of every generated account")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--plan", action="store_true", help="print the sizes without writing anything")
+    args = parser.parse_args(argv)
+    if args.subjects < 1 or args.lectures_per_day < 1 or args.class_size < 1:
+        parser.error("--subjects, --lectures-per-day and --class-size must be at least 1")
+    if args.teachers and args.teachers < args.subjects:
+        parser.error("--teachers must be at least --subjects")
+    if args.first_lecture_hour + args.lectures_per_day > 24:
+        parser.error("lectures would run past midnight")
+
+    if args.plan:
+        for name, value in plan(args).items():
+            print(f"{name:>12}: {value:,}")
+        return
+    generate(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Gunicorn settings, read automatically from the working directory.
+
+Workers and bind address keep gunicorn's defaults (``WEB_CONCURRENCY``,
+``PORT``). ``GUNICORN_THREADS`` above 1 switches to gunicorn's threaded
+(gthread) worker: a scan or status poll waiting on PostgreSQL then holds one
+thread instead of a whole process, so scan bursts no longer queue behind
+report downloads. Module-level caches are lock-protected and each request
+thread gets its own scoped database session.
+
+``GUNICORN_PRELOAD=1`` imports the app once in the master before forking:
+workers then start without importing it again and share its memory
+copy-on-write. In that mode ReportLab and qrcode are also imported in the
+master, so the first PDF or QR request in a worker does not pay for them.
+
+Prometheus metrics (metrics.py) are shared between workers through files in
+``PROMETHEUS_MULTIPROC_DIR``; a fresh temporary directory is used unless it
+is set, and it is emptied when gunicorn starts so restarts do not carry old
+counts.
+
+Importing the app opens no database connection (tables are created with
+``flask --app app init-db``); each forked worker still drops any pool it
+inherited so connections are never shared between processes.
+"""
+
+import glob
+import os
+import tempfile
+
+# Must be set before the app (and prometheus_client) is imported
+if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="attendance-metrics-")
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "0").strip().lower() in ("1", "true", "yes", "on")
+threads = int(os.environ.get("GUNICORN_THREADS", "1"))
+
+
+def on_starting(server):
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+
+
+def when_ready(server):
+    if preload_app:
+        import qrcode.image.pil  # noqa: F401  (pulls in Pillow)
+        import reportlab.platypus  # noqa: F401
+        server.log.info("Preloaded app, ReportLab and qrcode in the master")
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from app import app
+        from models import db
+
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    import metrics
+
+    metrics.mark_process_dead(worker.pid)
@@ -0,0 +1,253 @@
+"""
+Background execution of bulk CSV imports.
+
+An upload is saved to ``IMPORT_JOB_DIR`` and an ``ImportJob`` row is created,
+then the import runs on a small per-worker thread pool. Progress counters are
+written to the job row after every chunk, so any gunicorn worker can answer a
+progress poll. Rejected rows are streamed to an errors CSV next to the upload.
+Jobs that finished more than ``IMPORT_JOB_RETENTION_DAYS`` ago are deleted
+with their files whenever a new import is submitted. A queued or running job
+whose row has not been updated for ``IMPORT_JOB_STALE_MINUTES`` (its worker
+died or was restarted) is marked failed then, and when its progress is polled.
+"""
+
+import csv
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import csv_import
+import student_search
+from models import db, ImportJob
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Columns never copied into the downloadable errors CSV
+_SECRET_COLUMNS = {'password'}
+
+
+def get_job_dir(app):
+    """Directory shared by all workers on this host for uploads and error files."""
+    job_dir = app.config.get("IMPORT_JOB_DIR") or os.path.join(
+        tempfile.gettempdir(), "attendance_import_jobs"
+    )
+    os.makedirs(job_dir, exist_ok=True)
+    return job_dir
+
+
+def upload_path(app, job_uuid):
+    return os.path.join(get_job_dir(app), f"{job_uuid}.csv")
+
+
+def errors_path(app, job_uuid):
+    return os.path.join(get_job_dir(app), f"{job_uuid}_errors.csv")
+
+
+def mark_stale_jobs(app, now=None):
+    """Fail queued/running jobs with no progress for ``IMPORT_JOB_STALE_MINUTES``; return how many."""
+    now = now or datetime.now(timezone.utc)
+    minutes = app.config["IMPORT_JOB_STALE_MINUTES"]
+    stale = ImportJob.query.filter(
+        ImportJob.status.in_(("queued", "running")),
+        ImportJob.updated_at < now - timedelta(minutes=minutes)
+    ).update({
+        "status": "failed",
+        "message": f"No progress for {minutes} minutes; the worker running this import stopped. "
+                   f"Upload the file again to finish it.",
+        "finished_at": now,
+        "updated_at": now,
+    }, synchronize_session=False)
+    db.session.commit()
+    return stale
+
+
+def cleanup_old_jobs(app, now=None):
+    """Delete jobs finished before the retention period, their error CSVs, and stale files.
+
+    Files older than the retention period are removed even without a job row,
+    e.g. an upload left behind by a worker that died mid-import. Returns the
+    number of job rows deleted.
+    """
+    now = now or datetime.now(timezone.utc)
+    mark_stale_jobs(app, now)
+    cutoff = now - timedelta(days=app.config["IMPORT_JOB_RETENTION_DAYS"])
+    old_jobs = ImportJob.query.filter(
+        ImportJob.status.in_(("completed", "failed")),
+        ImportJob.finished_at < cutoff
+    ).all()
+    for job in old_jobs:
+        for path in (upload_path(app, job.job_uuid), errors_path(app, job.job_uuid)):
+            if os.path.exists(path):
+                os.remove(path)
+    if old_jobs:
+        ImportJob.query.filter(ImportJob.id.in_([job.id for job in old_jobs])).delete(synchronize_session=False)
+        db.session.commit()
+
+    job_dir = get_job_dir(app)
+    for name in os.listdir(job_dir):
+        path = os.path.join(job_dir, name)
+        try:
+            if name.endswith(".csv") and os.path.getmtime(path) < cutoff.timestamp():
+                os.remove(path)
+        except OSError:
+            pass  # removed by another worker meanwhile
+    return len(old_jobs)
+
+
+def _get_executor(app):
+    global _executor
+    # Request threads (gthread workers) may race to create it
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get("IMPORT_JOB_WORKERS", 1),
+                thread_name_prefix="csv-import"
+            )
+    return _executor
+
+
+def submit_import(app, file, kind, created_by, options):
+    """Save ``file`` and queue an import of ``kind`` ("students" or "passwords").
+
+    ``options`` are passed as keyword arguments to ``csv_import.import_students``
+    or ``csv_import.import_passwords``. Returns the new ``ImportJob``.
+    """
+    try:
+        cleanup_old_jobs(app)
+    except Exception:
+        db.session.rollback()
+        app.logger.exception("Cleaning up old import jobs failed")
+
+    job = ImportJob(
+        job_uuid=uuid.uuid4().hex,
+        kind=kind,
+        status="queued",
+        filename=file.filename,
+        created_by=created_by,
+        updated_at=datetime.now(timezone.utc)
+    )
+    file.stream.seek(0)
+    file.save(upload_path(app, job.job_uuid))
+
+    db.session.add(job)
+    db.session.commit()
+
+    _get_executor(app).submit(_run_import, app, job.id, job.job_uuid, kind, options)
+    return job
+
+
+def _count_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        return sum(1 for _ in reader)
+
+
+def _update_job(job_id, **fields):
+    fields["updated_at"] = datetime.now(timezone.utc)
+    ImportJob.query.filter_by(id=job_id).update(fields)
+    db.session.commit()
+
+
+def _run_import(app, job_id, job_uuid, kind, options):
+    with app.app_context():
+        path = upload_path(app, job_uuid)
+        # Claim the job; one marked failed as stale while it waited is not run
+        claimed = ImportJob.query.filter_by(id=job_id, status="queued").update(
+            {"status": "running", "updated_at": datetime.now(timezone.utc)}, synchronize_session=False
+        )
+        db.session.commit()
+        if not claimed:
+            db.session.remove()
+            return
+        try:
+            start_row = options.get("start_row", csv_import.FIRST_DATA_ROW)
+            total_rows = max(_count_rows(path) - (start_row - csv_import.FIRST_DATA_ROW), 0)
+            _update_job(job_id, status="running", total_rows=total_rows,
+                        started_at=datetime.now(timezone.utc))
+
+            with open(path, "rb") as stream, \
+                    open(errors_path(app, job_uuid), "w", newline='', encoding='utf-8') as error_file:
+                if kind == "students":
+                    reader = csv_import.open_csv_reader(stream, csv_import.STUDENT_REQUIRED_COLUMNS)
+                    import_func = csv_import.import_students
+                else:
+                    reader = csv_import.open_csv_reader(stream, ['email'])
+                    import_func = csv_import.import_passwords
+
+                password_column = options.get("password_column")
+                columns = [
+                    name for name in reader.fieldnames
+                    if name not in _SECRET_COLUMNS and name != password_column
+                ]
+                error_writer = csv.writer(error_file)
+                error_writer.writerow(["row_number", "error"] + columns)
+
+                def on_error(row_num, row, message):
+                    error_writer.writerow([row_num, message] + [row.get(name) or '' for name in columns])
+
+                def on_progress(result):
+                    error_file.flush()
+                    _update_job(job_id, processed_rows=result.processed,
+                                imported_rows=result.imported, failed_rows=result.failed)
+
+                result = import_func(reader, on_error=on_error, on_progress=on_progress, **options)
+
+            if result.resume_row:
+                _update_job(job_id, status="failed", resume_row=result.resume_row,
+                            message=f"Stopped at row {result.resume_row}: {result.stop_reason}",
+                            finished_at=datetime.now(timezone.utc))
+            else:
+                _update_job(job_id, status="completed", finished_at=datetime.now(timezone.utc))
+        except Exception as e:
+            db.session.rollback()
+            app.logger.exception(f"Import job {job_uuid} failed")
+            _update_job(job_id, status="failed", message=str(e),
+                        finished_at=datetime.now(timezone.utc))
+        finally:
+            if kind == "students":
+                student_search.invalidate_roll_index()
+            if os.path.exists(path):
+                os.remove(path)
+            db.session.remove()
+
+
+def _as_utc(value):
+    # SQLite hands back naive datetimes even for timezone-aware columns
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def job_progress(job):
+    """Progress snapshot for the polling endpoint, including rate and ETA."""
+    rate = None
+    eta_seconds = None
+    started_at = _as_utc(job.started_at)
+    if started_at:
+        end = _as_utc(job.finished_at) or datetime.now(timezone.utc)
+        elapsed = (end - started_at).total_seconds()
+        if elapsed > 0 and job.processed_rows:
+            rate = job.processed_rows / elapsed
+            if job.status == "running" and job.total_rows is not None:
+                eta_seconds = max(job.total_rows - job.processed_rows, 0) / rate
+
+    return {
+        "job_id": job.job_uuid,
+        "kind": job.kind,
+        "status": job.status,
+        "filename": job.filename,
+        "total_rows": job.total_rows,
+        "processed_rows": job.processed_rows,
+        "imported_rows": job.imported_rows,
+        "failed_rows": job.failed_rows,
+        "rows_per_second": round(rate, 1) if rate is not None else None,
+        "eta_seconds": round(eta_seconds) if eta_seconds is not None else None,
+        "resume_row": job.resume_row,
+        "message": job.message,
+        "done": job.status in ("completed", "failed"),
+    }
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Load test: simultaneous QR scans against a running server.
+
+Seeds a throwaway class with N students and a teacher in DATABASE_URL (the
+server's database), logs every student in over HTTP, then for each
+concurrency level opens a fresh session and has all N students scan it with
+that many requests in flight. Optionally keeps a teacher downloading the
+class records PDF in the background, the report load that used to starve
+scans on sync workers. Seeded rows are removed at the end.
+
+    gunicorn -w 2 app:app                         # sync workers
+    GUNICORN_THREADS=8 gunicorn -w 2 app:app      # threaded workers
+    python loadtest_scans.py --url http://127.0.0.1:8000 --students 300 \\
+        --levels 10,50,100 --report-load 2
+
+Only the standard library is used on the client side.
+"""
+
+import argparse
+import http.cookiejar
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import login_guard
+
+PASSWORD = "loadtest-pass"
+PREFIX = "loadtest"
+
+
+def seed(app, students):
+    """Create the load-test class, teacher and students; return (class id, teacher email, student emails)."""
+    from models import db, User, ClassModel, TeacherClass
+
+    # One hash for everyone: seeding stays fast and logins never rehash
+    password_hash = login_guard.generate_password_hash(PASSWORD)
+    with app.app_context():
+        class_obj = ClassModel(name=f"{PREFIX}-{uuid.uuid4().hex[:8]}")
+        teacher = User(name="Load Test Teacher", email=f"{PREFIX}-teacher-{class_obj.name}@example.com",
+                       password_hash=password_hash, role="teacher")
+        db.session.add_all([class_obj, teacher])
+        db.session.flush()
+        db.session.add(TeacherClass(teacher_id=teacher.id, class_id=class_obj.id))
+        emails = [f"{PREFIX}-{i}-{class_obj.name}@example.com" for i in range(students)]
+        db.session.add_all([
+            User(name=f"Load Test {i}", email=email, password_hash=password_hash,
+                 role="student", class_id=class_obj.id, roll_number=f"LT{i:05d}")
+            for i, email in enumerate(emails)
+        ])
+        db.session.commit()
+        return class_obj.id, teacher.email, emails
+
+
+def new_session(app, class_id):
+    """Start an attendance session for the class and return its QR payload."""
+    from models import db, SessionModel, TeacherClass
+
+    with app.app_context():
+        teacher_id = TeacherClass.query.filter_by(class_id=class_id).first().teacher_id
+        expiry = datetime.now(timezone.utc) + timedelta(minutes=30)
+        session = SessionModel(session_uuid=uuid.uuid4().hex, expiry=expiry,
+                               class_id=class_id, teacher_id=teacher_id)
+        db.session.add(session)
+        db.session.commit()
+        return f"{session.session_uuid}|{expiry.isoformat()}"
+
+
+def cleanup(app, class_id):
+    from models import db, User, Attendance, AttendanceOverride, SessionModel, TeacherClass, ClassModel
+
+    with app.app_context():
+        session_ids = [s.id for s in SessionModel.query.filter_by(class_id=class_id)]
+        user_ids = [u.id for u in User.query.filter_by(class_id=class_id)]
+        teacher_ids = [t.teacher_id for t in TeacherClass.query.filter_by(class_id=class_id)]
+        Attendance.query.filter(Attendance.session_id.in_(session_ids)).delete(synchronize_session=False)
+        AttendanceOverride.query.filter(AttendanceOverride.session_id.in_(session_ids)).delete(synchronize_session=False)
+        SessionModel.query.filter_by(class_id=class_id).delete(synchronize_session=False)
+        TeacherClass.query.filter_by(class_id=class_id).delete(synchronize_session=False)
+        User.query.filter(User.id.in_(user_ids + teacher_ids)).delete(synchronize_session=False)
+        ClassModel.query.filter_by(id=class_id).delete(synchronize_session=False)
+        db.session.commit()
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def login(base_url, email):
+    """Return an opener carrying the session cookie for ``email``."""
+    cookies = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(cookies), NoRedirect)
+    data = urllib.parse.urlencode({"email": email, "password": PASSWORD}).encode()
+    try:
+        opener.open(f"{base_url}/login", data=data, timeout=60).read()
+    except urllib.error.HTTPError as e:
+        # A successful login answers with a redirect to the dashboard
+        if e.code != 302:
+            raise
+    if not any(cookie.name == "session" for cookie in cookies):
+        raise RuntimeError(f"Login failed for {email}")
+    return opener
+
+
+def scan(base_url, opener, qr_data):
+    """POST one scan; return (latency seconds, ok)."""
+    request = urllib.request.Request(
+        f"{base_url}/mark_attendance",
+        data=json.dumps({"qr_data": qr_data}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    start = time.perf_counter()
+    try:
+        with opener.open(request, timeout=60) as response:
+            ok = json.loads(response.read()).get("ok", False)
+    except Exception:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def report_downloads(base_url, opener, class_id, stop, counter):
+    while not stop.is_set():
+        try:
+            opener.open(f"{base_url}/teacher/class/{class_id}/records/pdf", timeout=120).read()
+            counter[0] += 1
+        except Exception:
+            pass
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simultaneous QR scan load test.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--levels", default="10,50,100", help="comma-separated concurrency levels")
+    parser.add_argument("--report-load", type=int, default=0, help="background PDF downloads in flight")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows")
+    args = parser.parse_args()
+    base_url = args.url.rstrip("/")
+    levels = [int(level) for level in args.levels.split(",")]
+
+    from app import app
+
+    class_id, teacher_email, emails = seed(app, args.students)
+    try:
+        print(f"Logging in {len(emails)} students...")
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            openers = list(pool.map(lambda email: login(base_url, email), emails))
+
+        stop = threading.Event()
+        downloads = [0]
+        background = []
+        if args.report_load:
+            teacher = login(base_url, teacher_email)
+            for _ in range(args.report_load):
+                thread = threading.Thread(target=report_downloads,
+                                          args=(base_url, teacher, class_id, stop, downloads), daemon=True)
+                thread.start()
+                background.append(thread)
+
+        print(f"{'in flight':>9} {'scans':>6} {'ok':>6} {'scans/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for level in levels:
+            qr_data = new_session(app, class_id)
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=level) as pool:
+                results = list(pool.map(lambda opener: scan(base_url, opener, qr_data), openers))
+            elapsed = time.perf_counter() - start
+            latencies = [latency * 1000 for latency, _ in results]
+            ok = sum(1 for _, success in results if success)
+            print(f"{level:>9} {len(results):>6} {ok:>6} {len(results) / elapsed:>8.0f} "
+                  f"{statistics.median(latencies):>8.0f} {percentile(latencies, 0.95):>8.0f} "
+                  f"{percentile(latencies, 0.99):>8.0f}")
+
+        stop.set()
+        for thread in background:
+            thread.join(timeout=120)
+        if args.report_load:
+            print(f"Background PDF downloads completed: {downloads[0]}")
+    finally:
+        if not args.keep:
+            cleanup(app, class_id)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
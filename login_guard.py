@@ -0,0 +1,111 @@
+"""
+Login throughput protection.
+
+- ``HashSlots`` bounds how many password hash verifications run at once in
+  a worker. Extra logins queue for up to ``LOGIN_HASH_WAIT_SECONDS`` and,
+  past ``LOGIN_HASH_QUEUE`` waiters or that wait, are rejected straight away
+  so the route can answer 429 instead of piling up CPU work.
+  The slots only take effect with threaded (gthread) workers: a sync worker
+  handles one request at a time, so it never has two hashes to bound.
+- ``AttemptThrottle`` counts failed logins per key (client IP, email) in a
+  sliding window, kept in memory per worker. The IP is the one the trusted
+  proxy saw (``TRUSTED_PROXY_HOPS``), not the client-supplied header.
+- ``generate_password_hash`` hashes with ``PASSWORD_HASH_METHOD`` and
+  ``needs_rehash`` spots hashes made with other parameters, so they can be
+  upgraded on the next successful login.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from werkzeug.security import generate_password_hash as _generate_password_hash
+
+# Werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000"
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+
+
+def generate_password_hash(password):
+    """Hash ``password`` with the configured method and parameters."""
+    return _generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+
+def needs_rehash(password_hash):
+    """True if ``password_hash`` was made with a different method or cost."""
+    return password_hash.split("$", 1)[0] != PASSWORD_HASH_METHOD
+
+
+class HashSlots:
+    """A bounded number of concurrent hash verifications with a short queue."""
+
+    def __init__(self, slots, max_waiting, wait_seconds):
+        self._semaphore = threading.BoundedSemaphore(slots)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self.max_waiting = max_waiting
+        self.wait_seconds = wait_seconds
+
+    def acquire(self):
+        """Take a slot, waiting briefly; return False if the worker is saturated."""
+        if self._semaphore.acquire(blocking=False):
+            return True
+        with self._lock:
+            if self._waiting >= self.max_waiting:
+                return False
+            self._waiting += 1
+        try:
+            return self._semaphore.acquire(timeout=self.wait_seconds)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def release(self):
+        self._semaphore.release()
+
+
+class AttemptThrottle:
+    """Failed attempts per key within ``window`` seconds, capped at ``max_keys`` keys."""
+
+    def __init__(self, limit, window, max_keys=50000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def _recent(self, key, now):
+        attempts = self._attempts.get(key)
+        if attempts is None:
+            return None
+        while attempts and attempts[0] <= now - self.window:
+            attempts.popleft()
+        if not attempts:
+            del self._attempts[key]
+            return None
+        return attempts
+
+    def retry_after(self, key):
+        """Seconds until ``key`` may try again, or 0 if it is not throttled."""
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._recent(key, now)
+            if attempts is None or len(attempts) < self.limit:
+                return 0
+            return max(1, int(attempts[0] + self.window - now) + 1)
+
+    def record_failure(self, key):
+        now = time.monotonic()
+        with self._lock:
+            if key not in self._attempts and len(self._attempts) >= self.max_keys:
+                # Drop the oldest keys rather than grow without bound
+                for old_key in list(self._attempts)[:self.max_keys // 10 or 1]:
+                    del self._attempts[old_key]
+            attempts = self._recent(key, now) or self._attempts.setdefault(key, deque())
+            attempts.append(now)
+            if len(attempts) > self.limit:
+                attempts.popleft()
+
+    def reset(self, key):
+        with self._lock:
+            self._attempts.pop(key, None)
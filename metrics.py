@@ -0,0 +1,142 @@
+"""
+Prometheus metrics for routes, the database pool, QR scans and caches.
+
+``/metrics`` serves, in the Prometheus text format:
+
+- ``attendance_http_requests_total{method,endpoint,status}`` and
+  ``attendance_http_request_duration_seconds{method,endpoint}`` per Flask
+  endpoint (not per URL, so class and session ids do not multiply series)
+- ``attendance_db_pool_size`` / ``attendance_db_pool_in_use{engine}`` and the
+  ``attendance_db_pool_wait_seconds{engine}`` checkout wait histogram
+- ``attendance_scans_total{result}``: accepted, duplicate, expired,
+  rejected_network, not_found, invalid
+- ``attendance_cache_requests_total{cache,result}``: hit / miss for the
+  per-worker caches (user, wifi_matcher, roll_index, replica_lag)
+
+Under gunicorn every worker writes its samples to files in
+``PROMETHEUS_MULTIPROC_DIR`` (gunicorn.conf.py sets one up and clears it on
+start), and a scrape sums them across the host's workers, whichever worker
+answers it. Without that variable (``python app.py``) the metrics are the
+single process's.
+"""
+
+import os
+import time
+
+from flask import g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+
+import db_engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUESTS = Counter(
+    "attendance_http_requests_total", "HTTP requests by endpoint and status", ["method", "endpoint", "status"]
+)
+LATENCY = Histogram(
+    "attendance_http_request_duration_seconds", "Request latency by endpoint", ["method", "endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+POOL_SIZE = Gauge(
+    "attendance_db_pool_size", "Configured pool size, summed over live workers", ["engine"],
+    multiprocess_mode="livesum",
+)
+POOL_IN_USE = Gauge(
+    "attendance_db_pool_in_use", "Connections checked out, summed over live workers", ["engine"],
+    multiprocess_mode="livesum",
+)
+POOL_WAIT = Histogram(
+    "attendance_db_pool_wait_seconds", "Time spent waiting for a pooled connection", ["engine"],
+    buckets=db_engine.WAIT_BUCKETS,
+)
+SCANS = Counter("attendance_scans_total", "QR scans by outcome", ["result"])
+CACHE = Counter("attendance_cache_requests_total", "Per-worker cache lookups", ["cache", "result"])
+
+SCAN_RESULTS = ("accepted", "duplicate", "expired", "rejected_network", "not_found", "invalid")
+
+
+def multiprocess_dir():
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or None
+
+
+def scan(result):
+    SCANS.labels(result=result).inc()
+
+
+def cache_lookup(cache, hit):
+    CACHE.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def _observe_pool_wait(pool, waited):
+    POOL_WAIT.labels(engine=pool.logging_name or "primary").observe(waited)
+
+
+def instrument_engine(name, engine):
+    """Track checked-out connections of ``engine`` under the label ``name``."""
+    in_use = POOL_IN_USE.labels(engine=name)
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        in_use.inc()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        in_use.dec()
+
+
+def render():
+    """(body, content type) for a scrape, aggregated across workers when multi-process."""
+    if multiprocess_dir():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def init_app(app, db):
+    """Time every request and instrument the app's engines."""
+    engine_names = {}
+    with app.app_context():
+        for key, engine in db.engines.items():
+            name = key or "primary"
+            engine_names[name] = engine
+            instrument_engine(name, engine)
+    if _observe_pool_wait not in db_engine.pool_wait_observers:
+        db_engine.pool_wait_observers.append(_observe_pool_wait)
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _note_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _record_request(exc):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return
+        # after_request handlers are skipped when an exception escapes the view
+        # (or another after_request handler), so no status means a 500
+        status = g.pop("metrics_status", 500)
+        endpoint = request.endpoint or "unmatched"
+        LATENCY.labels(method=request.method, endpoint=endpoint).observe(time.perf_counter() - started)
+        REQUESTS.labels(method=request.method, endpoint=endpoint, status=str(status)).inc()
+        # Set from the worker itself: gauges written before fork would count the master
+        for name, engine in engine_names.items():
+            size = getattr(engine.pool, "size", None)
+            if size is not None:
+                POOL_SIZE.labels(engine=name).set(size())
+
+
+def mark_process_dead(pid):
+    """Drop a dead worker's live gauges (gunicorn ``child_exit``)."""
+    if multiprocess_dir():
+        multiprocess.mark_process_dead(pid)
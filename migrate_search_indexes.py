@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+"""
+Superseded by migrations.py (0003_student_search).
+Kept so existing deployment steps keep working; it applies only that
+migration (see ``python migrations.py --list`` for the rest).
+"""
+
+import migrations
+
+if __name__ == "__main__":
+    migrations.main(["--only", "0003_student_search"])
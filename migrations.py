@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Schema migrations for PostgreSQL deployments.
+
+Replaces the one-off migrate_*.py scripts with one ordered list. Applied
+migrations are recorded in ``schema_migrations``, so running this again only
+applies what is new:
+
+    python migrations.py            # apply pending migrations
+    python migrations.py --list     # show applied / pending
+    python migrations.py --dry-run  # print the SQL without running it
+    python migrations.py --only 0002_proxy_lectures    # apply just this one
+    python migrations.py --include 0005_partition_attendance
+                                    # also apply an opt-in migration
+
+Each migration has:
+- ``statements``: SQL strings, or functions taking the connection, run in one
+  transaction with a short ``lock_timeout``, so an ALTER that would queue
+  behind a long-running query fails fast instead of blocking every request
+  behind it
+- ``indexes``: built with CREATE INDEX CONCURRENTLY outside a transaction, so
+  the table stays readable and writable. An INVALID index left by an earlier
+  failed build is dropped and rebuilt.
+- ``steps``: functions taking the engine, run after ``statements`` in their
+  own short transactions (batched backfills, constraint validation)
+- ``opt_in``: not part of a plain run. Table rewrites that need a maintenance
+  window are only applied when named with ``--include`` (or ``--only``).
+
+Fresh databases get the tables and most indexes from ``db.create_all()``
+(they are declared in models.py too); running the migrations there adds the
+PostgreSQL-only ones (trigram, prefix) and records everything as applied.
+On other databases only the ``portable`` migrations run; they check the
+schema themselves, so they are not recorded.
+"""
+
+import argparse
+import os
+import sys
+from collections import namedtuple
+
+from sqlalchemy import inspect, text
+
+from db_engine import create_db_engine, get_database_url, is_postgres
+import partitions
+
+LOCK_TIMEOUT = os.environ.get("MIGRATION_LOCK_TIMEOUT", "5s")
+
+Migration = namedtuple(
+    "Migration", "id description statements indexes analyze opt_in steps portable", defaults=(False, (), False)
+)
+
+SESSION_CREATED_AT_TABLES = ("attendance", "attendance_overrides")
+BACKFILL_BATCH_ROWS = int(os.environ.get("MIGRATION_BACKFILL_BATCH_ROWS", "5000"))
+
+
+def concurrent_index(name, definition):
+    """(name, SQL) for an index built without blocking writes."""
+    return name, f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}"
+
+
+def add_session_created_at(conn):
+    """Add a nullable session_created_at column to both tables; metadata only, no rewrite.
+
+    On PostgreSQL a trigger fills it in for rows inserted by code that
+    predates the column, which keeps running until the deploy finishes.
+    """
+    for table in SESSION_CREATED_AT_TABLES:
+        columns = {column["name"] for column in inspect(conn).get_columns(table)}
+        if "session_created_at" not in columns:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN session_created_at TIMESTAMP WITH TIME ZONE"))
+    if conn.dialect.name != "postgresql":
+        return
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION fill_session_created_at() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.session_created_at IS NULL THEN
+                SELECT created_at INTO NEW.session_created_at FROM sessions WHERE id = NEW.session_id;
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """))
+    for table in SESSION_CREATED_AT_TABLES:
+        # Partitioned tables (0005) already require the column
+        if partitions.is_partitioned(conn, table):
+            continue
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_fill_session_created_at ON {table}"))
+        conn.execute(text(
+            f"CREATE TRIGGER {table}_fill_session_created_at BEFORE INSERT ON {table} "
+            f"FOR EACH ROW EXECUTE PROCEDURE fill_session_created_at()"
+        ))
+
+
+def backfill_session_created_at(engine):
+    """Copy sessions.created_at into rows that lack it, one committed batch at a time."""
+    for table in SESSION_CREATED_AT_TABLES:
+        last_id = 0
+        filled = 0
+        while True:
+            with engine.begin() as conn:
+                ids = conn.execute(text(
+                    f"SELECT id FROM {table} WHERE session_created_at IS NULL AND id > :last_id "
+                    f"ORDER BY id LIMIT :batch"
+                ), {"last_id": last_id, "batch": BACKFILL_BATCH_ROWS}).scalars().all()
+                if not ids:
+                    break
+                filled += conn.execute(text(f"""
+                    UPDATE {table} SET session_created_at = (
+                        SELECT sessions.created_at FROM sessions WHERE sessions.id = {table}.session_id
+                    )
+                    WHERE id >= :first AND id <= :last AND session_created_at IS NULL
+                      AND EXISTS (SELECT 1 FROM sessions WHERE sessions.id = {table}.session_id)
+                """), {"first": ids[0], "last": ids[-1]}).rowcount
+            last_id = ids[-1]
+        print(f"    🔄 {table}: {filled} rows backfilled")
+
+
+def require_session_created_at(engine):
+    """SET NOT NULL without a long lock: validate a CHECK first, which PostgreSQL 12+ then reuses."""
+    if engine.dialect.name != "postgresql":
+        return  # SQLite cannot add NOT NULL to an existing column; the app always sets it
+    for table in SESSION_CREATED_AT_TABLES:
+        check = f"{table}_session_created_at_not_null"
+        with engine.connect() as conn:
+            nullable = conn.execute(text("""
+                SELECT is_nullable FROM information_schema.columns
+                WHERE table_schema = 'public' AND table_name = :table AND column_name = 'session_created_at'
+            """), {"table": table}).scalar()
+        if nullable == "NO":
+            continue
+        # Each step in its own transaction: only ADD/SET/DROP take the brief exclusive lock,
+        # VALIDATE scans the table while reads and writes go on
+        for statement in (
+            f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {check}",
+            f"ALTER TABLE {table} ADD CONSTRAINT {check} CHECK (session_created_at IS NOT NULL) NOT VALID",
+            f"ALTER TABLE {table} VALIDATE CONSTRAINT {check}",
+            f"ALTER TABLE {table} ALTER COLUMN session_created_at SET NOT NULL",
+            f"ALTER TABLE {table} DROP CONSTRAINT {check}",
+        ):
+            with engine.begin() as conn:
+                conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+                conn.execute(text("SET LOCAL statement_timeout = 0"))
+                conn.execute(text(statement))
+
+
+MIGRATIONS = [
+    Migration(
+        id="0001_hod_principal_roles",
+        description="users.department_id and the hod/principal roles",
+        statements=[
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS department_id INTEGER REFERENCES departments(id)",
+            # ADD VALUE IF NOT EXISTS is allowed in a transaction from PostgreSQL 12
+            "ALTER TYPE user_roles ADD VALUE IF NOT EXISTS 'hod'",
+            "ALTER TYPE user_roles ADD VALUE IF NOT EXISTS 'principal'",
+        ],
+        indexes=[
+            concurrent_index("ix_users_department_id", "users (department_id)"),
+        ],
+        analyze=[],
+    ),
+    Migration(
+        id="0002_proxy_lectures",
+        description="sessions.is_proxy and proxy_teacher_name",
+        statements=[
+            "ALTER TABLE sessions ADD COLUMN IF NOT EXISTS is_proxy BOOLEAN DEFAULT FALSE",
+            "ALTER TABLE sessions ADD COLUMN IF NOT EXISTS proxy_teacher_name VARCHAR(100)",
+        ],
+        indexes=[
+            concurrent_index("idx_sessions_is_proxy", "sessions (is_proxy)"),
+        ],
+        analyze=[],
+    ),
+    Migration(
+        id="0003_student_search",
+        description="trigram and prefix indexes for student search, keyset index for the student list",
+        statements=[
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        ],
+        indexes=[
+            concurrent_index("ix_users_name_trgm", "users USING gin (name gin_trgm_ops)"),
+            concurrent_index("ix_users_email_trgm", "users USING gin (email gin_trgm_ops)"),
+            concurrent_index("ix_users_roll_number_trgm", "users USING gin (roll_number gin_trgm_ops)"),
+            concurrent_index("ix_users_name_lower_prefix", "users (lower(name) text_pattern_ops)"),
+            concurrent_index("ix_users_email_lower_prefix", "users (lower(email) text_pattern_ops)"),
+            concurrent_index(
+                "ix_users_student_listing",
+                "users (coalesce(class_id, 0), coalesce(roll_number, ''), id) WHERE role = 'student'",
+            ),
+        ],
+        analyze=["users"],
+    ),
+    Migration(
+        id="0004_hot_path_indexes",
+        description="composite indexes for latest session, class rosters, dashboard counts and password history",
+        statements=[],
+        indexes=[
+            # Latest session / records of a class: WHERE class_id = ? ORDER BY created_at DESC
+            concurrent_index("ix_sessions_class_created", "sessions (class_id, created_at DESC)"),
+            # Recent sessions on the admin/principal dashboards
+            concurrent_index("ix_sessions_created_at", "sessions (created_at DESC)"),
+            # Every roster: WHERE class_id = ? AND role = 'student' ORDER BY roll_number
+            concurrent_index("ix_users_class_role_roll", "users (class_id, role, roll_number)"),
+            # Dashboard counts: WHERE role = ? AND status = ?
+            concurrent_index("ix_users_role_status", "users (role, status)"),
+            # Latest password change per user (password_directory.latest_password_changes)
+            concurrent_index("ix_password_logs_user_timestamp", "password_logs (user_id, timestamp DESC)"),
+        ],
+        analyze=["sessions", "users", "password_logs"],
+    ),
+    Migration(
+        id="0005_partition_attendance",
+        description="monthly partitions for attendance and attendance_overrides (rewrites both tables)",
+        # Copies every row under an exclusive lock: run in a maintenance window
+        statements=[partitions.partition_attendance_tables],
+        indexes=[],
+        analyze=["attendance", "attendance_overrides"],
+        opt_in=True,
+    ),
+    Migration(
+        id="0006_attendance_session_created_at",
+        description="attendance/attendance_overrides.session_created_at: add nullable, backfill in batches, NOT NULL",
+        # Needed before code that reads the column ships. Independent of 0005, which
+        # adds the column itself if it runs first
+        statements=[add_session_created_at],
+        steps=[backfill_session_created_at, require_session_created_at],
+        indexes=[],
+        analyze=["attendance", "attendance_overrides"],
+        portable=True,
+    ),
+]
+
+
+def ensure_migrations_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                id VARCHAR(100) PRIMARY KEY,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+        """))
+
+
+def applied_migrations(engine):
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT to_regclass('schema_migrations')")).scalar() is None:
+            return set()
+        return {row[0] for row in conn.execute(text("SELECT id FROM schema_migrations"))}
+
+
+def build_index(conn, name, statement):
+    """Run one CREATE INDEX CONCURRENTLY on an autocommit connection."""
+    invalid = conn.execute(text("""
+        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = :name AND NOT i.indisvalid
+    """), {"name": name}).fetchone()
+    if invalid:
+        print(f"    ⚠️  {name} is invalid, rebuilding")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    print(f"    ➕ {name}")
+    conn.execute(text(statement))
+
+
+def apply_migration(engine, migration):
+    if migration.statements:
+        with engine.begin() as conn:
+            conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+            # Table copies can run long; a role-level statement_timeout must not cut them off
+            conn.execute(text("SET LOCAL statement_timeout = 0"))
+            for statement in migration.statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(text(statement))
+
+    for step in migration.steps:
+        step(engine)
+
+    if migration.indexes or migration.analyze:
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+        with engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            conn.execute(text("SET statement_timeout = 0"))
+            for name, statement in migration.indexes:
+                build_index(conn, name, statement)
+            for table in migration.analyze:
+                conn.execute(text(f"ANALYZE {table}"))
+
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO schema_migrations (id) VALUES (:id)"), {"id": migration.id})
+
+
+def print_sql(migration):
+    print(f"-- {migration.id}: {migration.description}")
+    for statement in migration.statements:
+        if callable(statement):
+            print(f"-- {statement.__module__}.{statement.__name__}: {statement.__doc__}")
+        else:
+            print(f"{statement};")
+    for step in migration.steps:
+        print(f"-- {step.__module__}.{step.__name__}: {step.__doc__}")
+    for _, statement in migration.indexes:
+        print(f"{statement};")
+    for table in migration.analyze:
+        print(f"ANALYZE {table};")
+
+
+def run_portable_migrations(database_url, list_only=False, dry_run=False, only=()):
+    """Non-PostgreSQL databases: db.create_all() builds new tables, these catch up old ones."""
+    portable = [m for m in MIGRATIONS if m.portable and (not only or m.id in only)]
+    print("⏭️  Other migrations are PostgreSQL-only; db.create_all() builds the schema for this database")
+    if list_only or dry_run:
+        for migration in portable:
+            print(f"🔁 {migration.id}: {migration.description} (checked on every run)")
+        return True
+
+    engine = create_db_engine(database_url)
+    for migration in portable:
+        print(f"🔄 {migration.id}: {migration.description}")
+        try:
+            with engine.begin() as conn:
+                for statement in migration.statements:
+                    statement(conn)
+            for step in migration.steps:
+                step(engine)
+        except Exception as e:
+            print(f"❌ {migration.id} failed: {e}")
+            return False
+        print(f"  ✅ {migration.id} done")
+    return True
+
+
+def run_migrations(list_only=False, dry_run=False, only=(), include=()):
+    """Apply pending migrations in order. Returns False if one failed.
+
+    ``only`` limits the run to those ids; opt-in migrations run only when
+    named in ``only`` or ``include``.
+    """
+    known = {m.id for m in MIGRATIONS}
+    unknown = sorted((set(only) | set(include)) - known)
+    if unknown:
+        print(f"❌ Unknown migration(s): {', '.join(unknown)} (see python migrations.py --list)")
+        return False
+
+    database_url = get_database_url()
+    if not is_postgres(database_url):
+        return run_portable_migrations(database_url, list_only, dry_run, only)
+
+    # Without the app's DB_STATEMENT_TIMEOUT_MS: index builds and copies take as long as they take
+    engine = create_db_engine(database_url, statement_timeout_ms=0)
+    if not (list_only or dry_run):
+        ensure_migrations_table(engine)
+    applied = applied_migrations(engine)
+    pending = [m for m in MIGRATIONS if m.id not in applied and (not only or m.id in only)]
+
+    if list_only:
+        for migration in MIGRATIONS:
+            mark = "✅" if migration.id in applied else "⏳"
+            note = f" (opt-in: --include {migration.id})" if migration.opt_in and migration.id not in applied else ""
+            print(f"{mark} {migration.id}: {migration.description}{note}")
+        return True
+
+    for migration in [m for m in pending if m.opt_in and m.id not in only and m.id not in include]:
+        print(f"⏭️  {migration.id} is opt-in; run it in a maintenance window with --include {migration.id}")
+        pending.remove(migration)
+
+    if not pending:
+        print("✅ Database is up to date")
+        return True
+
+    for migration in pending:
+        if dry_run:
+            print_sql(migration)
+            continue
+        print(f"🔄 {migration.id}: {migration.description}")
+        try:
+            apply_migration(engine, migration)
+        except Exception as e:
+            print(f"❌ {migration.id} failed: {e}")
+            print("   Fix the cause and run again; finished steps are skipped or rebuilt.")
+            return False
+        print(f"  ✅ {migration.id} applied")
+
+    if not dry_run:
+        print("🎉 Migrations completed successfully!")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply database schema migrations.")
+    parser.add_argument("--list", action="store_true", help="show applied and pending migrations")
+    parser.add_argument("--dry-run", action="store_true", help="print the SQL of pending migrations")
+    parser.add_argument("--only", action="append", default=[], metavar="ID",
+                        help="apply only this migration (repeatable)")
+    parser.add_argument("--include", action="append", default=[], metavar="ID",
+                        help="also apply this opt-in migration (repeatable)")
+    args = parser.parse_args(argv)
+    if not run_migrations(list_only=args.list, dry_run=args.dry_run, only=args.only, include=args.include):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,11 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from sqlalchemy.dialects.postgresql import ENUM
 
-# SQLAlchemy instance, initialized in app factory
-db = SQLAlchemy()
+from read_replica import RoutingSession
+
+# SQLAlchemy instance, initialized in app factory. The session class sends
+# reads from read-only report views to the replica (see read_replica.py).
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
 class ClassModel(db.Model):
@@ -70,6 +73,18 @@ class User(db.Model, UserMixin):
     teacher_classes = db.relationship("TeacherClass", back_populates="teacher", lazy=True)
     department = db.relationship("Department", backref="hod")
 
+    __table_args__ = (
+        # Keyset order of the admin student list (see student_listing.py)
+        db.Index(
+            "ix_users_student_listing",
+            db.func.coalesce(class_id, 0), db.func.coalesce(roll_number, ""), id,
+            postgresql_where=db.text("role = 'student'"),
+        ),
+        # Class rosters ordered by roll number, and dashboard counts by role/status
+        db.Index("ix_users_class_role_roll", class_id, role, roll_number),
+        db.Index("ix_users_role_status", role, status),
+    )
+
 
 class SessionModel(db.Model):
     """Attendance session generated by a teacher and encoded into QR code."""
@@ -92,6 +107,12 @@ class SessionModel(db.Model):
     class_obj = db.relationship("ClassModel", back_populates="sessions", lazy=True)
     teacher = db.relationship("User", backref="sessions")
 
+    __table_args__ = (
+        # Latest session / records of a class, and recent sessions on the dashboards
+        db.Index("ix_sessions_class_created", class_id, created_at.desc()),
+        db.Index("ix_sessions_created_at", created_at.desc()),
+    )
+
 
 class WiFiNetwork(db.Model):
     """WiFi network configuration for attendance verification."""
@@ -118,6 +139,8 @@ class Attendance(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
     session_id = db.Column(db.Integer, db.ForeignKey("sessions.id"), nullable=False, index=True)
+    # Copy of the session's created_at; the monthly partition key on PostgreSQL (see partitions.py)
+    session_created_at = db.Column(db.DateTime(timezone=True), nullable=False)
     timestamp = db.Column(
         db.DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc)
     )
@@ -132,6 +155,11 @@ class Attendance(db.Model):
         db.UniqueConstraint("user_id", "session_id", name="uq_attendance_user_session"),
     )
 
+    @classmethod
+    def of_session(cls, session):
+        """Attendance of one session, filtered on the partition key so only its month is scanned."""
+        return cls.query.filter_by(session_id=session.id, session_created_at=session.created_at)
+
 
 class Department(db.Model):
     """Department model for organizing academic departments."""
@@ -191,6 +219,8 @@ class AttendanceOverride(db.Model):
     session_id = db.Column(db.Integer, db.ForeignKey("sessions.id"), nullable=False, index=True)
     student_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
     teacher_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    # Copy of the session's created_at; the monthly partition key on PostgreSQL (see partitions.py)
+    session_created_at = db.Column(db.DateTime(timezone=True), nullable=False)
     action = db.Column(ENUM("mark_present", "mark_absent", name="override_action"), nullable=False)
     timestamp = db.Column(db.DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
     reason = db.Column(db.Text, nullable=True)
@@ -220,4 +250,33 @@ class PasswordLog(db.Model):
     user = db.relationship("User", foreign_keys=[user_id], backref="password_logs")
     admin = db.relationship("User", foreign_keys=[admin_id], backref="admin_password_logs")
 
+    __table_args__ = (
+        # Latest change per user (password_directory.latest_password_changes)
+        db.Index("ix_password_logs_user_timestamp", user_id, timestamp.desc()),
+    )
+
 
+class ImportJob(db.Model):
+    """Background CSV import job with progress counters for polling."""
+    
+    __tablename__ = "import_jobs"
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_uuid = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # "students" or "passwords"
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued, running, completed, failed
+    filename = db.Column(db.String(255), nullable=True)
+    total_rows = db.Column(db.Integer, nullable=True)
+    processed_rows = db.Column(db.Integer, nullable=False, default=0)
+    imported_rows = db.Column(db.Integer, nullable=False, default=0)
+    failed_rows = db.Column(db.Integer, nullable=False, default=0)
+    resume_row = db.Column(db.Integer, nullable=True)  # Set when a chunk failed to commit
+    message = db.Column(db.Text, nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    started_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    
+    # Relationships
+    creator = db.relationship("User", backref="import_jobs")
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Monthly partitions for ``attendance`` and ``attendance_overrides`` (PostgreSQL).
+
+Both tables are range-partitioned on ``session_created_at``, a copy of the
+session's start time, so every row of a session lives in one monthly
+partition (``attendance_2025_01`` ...) and lookups through
+``Attendance.of_session`` only scan that month. A ``*_default`` partition
+catches rows for months that have no partition yet.
+
+    python partitions.py list
+    python partitions.py ensure [--months-ahead 3]
+    python partitions.py archive --before 2025-06 [--export-dir DIR [--drop]]
+
+``ensure`` creates the coming months' partitions; run it from a monthly cron
+job. ``archive`` detaches every month before ``--before`` and moves it to the
+``archive`` schema as a standalone table (foreign keys dropped, so students
+can still be deleted). With ``--export-dir`` each archived month is also
+written to a gzipped CSV, and ``--drop`` then drops the table.
+
+The one-off conversion of existing tables is the opt-in migration
+``0005_partition_attendance`` in migrations.py
+(``python migrations.py --include 0005_partition_attendance``).
+"""
+
+import argparse
+import gzip
+import os
+import re
+import sys
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from db_engine import create_db_engine, get_database_url, is_postgres
+
+PARTITION_KEY = "session_created_at"
+ARCHIVE_SCHEMA = "archive"
+LOCK_TIMEOUT = os.environ.get("MIGRATION_LOCK_TIMEOUT", "5s")
+
+# Constraints and indexes recreated on the partitioned tables. The partition
+# key must be part of every unique constraint, which keeps them equivalent:
+# session_created_at is fixed per session_id.
+PARTITIONED_TABLES = {
+    "attendance": {
+        "unique": {"uq_attendance_user_session": ("user_id", "session_id")},
+        "foreign_keys": {"user_id": "users", "session_id": "sessions", "wifi_network_id": "wifi_networks"},
+        "indexes": ("user_id", "session_id"),
+    },
+    "attendance_overrides": {
+        "unique": {},
+        "foreign_keys": {"session_id": "sessions", "student_id": "users", "teacher_id": "users"},
+        "indexes": ("session_id", "student_id", "teacher_id"),
+    },
+}
+
+
+def month_start(value):
+    """First instant (UTC) of the month containing ``value``."""
+    value = value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def parse_month(value):
+    """'2025-06' -> first instant of that month. Raises ``ValueError`` if malformed."""
+    return datetime.strptime(value, "%Y-%m").replace(tzinfo=timezone.utc)
+
+
+def partition_name(table, month):
+    return f"{table}_{month:%Y_%m}"
+
+
+def month_range(first, last):
+    month = month_start(first)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def is_partitioned(conn, table):
+    return conn.execute(text("""
+        SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid
+        WHERE c.relname = :table AND c.relnamespace = 'public'::regnamespace
+    """), {"table": table}).fetchone() is not None
+
+
+def month_partitions(conn, table):
+    """{month: partition name} for the attached monthly partitions of ``table``."""
+    names = conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = :table AND p.relnamespace = 'public'::regnamespace
+    """), {"table": table}).scalars()
+    pattern = re.compile(rf"^{re.escape(table)}_(\d{{4}})_(\d{{2}})$")
+    partitions = {}
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            partitions[datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc)] = name
+    return partitions
+
+
+def create_month_partition(conn, table, month):
+    """Create the partition for ``month``, moving any of its rows out of the default partition."""
+    name = partition_name(table, month)
+    bounds = {"start": month, "end": add_months(month, 1)}
+    default = f"{table}_default"
+    in_default = conn.execute(text(
+        f"SELECT 1 FROM {default} WHERE {PARTITION_KEY} >= :start AND {PARTITION_KEY} < :end LIMIT 1"
+    ), bounds).fetchone()
+    values = f"FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+    if not in_default:
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES {values}"))
+        return name
+
+    # A new partition may not overlap rows already in the default one
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"))
+    conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {default} WHERE {PARTITION_KEY} >= :start AND {PARTITION_KEY} < :end RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), bounds)
+    conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES {values}"))
+    return name
+
+
+def ensure_partitions(conn, months_ahead=3, now=None):
+    """Create missing partitions from this month through ``months_ahead`` months ahead."""
+    current = month_start(now or datetime.now(timezone.utc))
+    created = []
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(conn, table):
+            continue
+        existing = month_partitions(conn, table)
+        for month in month_range(current, add_months(current, months_ahead)):
+            if month not in existing:
+                created.append(create_month_partition(conn, table, month))
+    return created
+
+
+def partition_table(conn, table, months_ahead=3):
+    """Rebuild a plain table as a monthly-partitioned one, copying its rows."""
+    if is_partitioned(conn, table):
+        return
+    spec = PARTITIONED_TABLES[table]
+    staging = f"{table}_partitioned"
+
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {PARTITION_KEY} TIMESTAMPTZ"))
+    conn.execute(text(f"""
+        UPDATE {table} t SET {PARTITION_KEY} = s.created_at
+        FROM sessions s WHERE s.id = t.session_id AND t.{PARTITION_KEY} IS NULL
+    """))
+    conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {PARTITION_KEY} SET NOT NULL"))
+
+    conn.execute(text(
+        f"CREATE TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) PARTITION BY RANGE ({PARTITION_KEY})"
+    ))
+    first, last = conn.execute(text(f"SELECT min({PARTITION_KEY}), max({PARTITION_KEY}) FROM {table}")).one()
+    current = month_start(datetime.now(timezone.utc))
+    first = month_start(first) if first else current
+    last = max(month_start(last), current) if last else current
+    for month in month_range(first, add_months(last, months_ahead)):
+        conn.execute(text(
+            f"CREATE TABLE {partition_name(table, month)} PARTITION OF {staging} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+    conn.execute(text(f"CREATE TABLE {table}_default PARTITION OF {staging} DEFAULT"))
+    conn.execute(text(f"INSERT INTO {staging} SELECT * FROM {table}"))
+
+    # Keep the id sequence when the old table goes
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}).scalar()
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {staging}.id"))
+    conn.execute(text(f"DROP TABLE {table}"))
+    conn.execute(text(f"ALTER TABLE {staging} RENAME TO {table}"))
+
+    conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, {PARTITION_KEY})"))
+    for name, columns in spec["unique"].items():
+        conn.execute(text(
+            f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE ({', '.join(columns)}, {PARTITION_KEY})"
+        ))
+    for column, target in spec["foreign_keys"].items():
+        conn.execute(text(
+            f"ALTER TABLE {table} ADD CONSTRAINT {table}_{column}_fkey "
+            f"FOREIGN KEY ({column}) REFERENCES {target}(id)"
+        ))
+    for column in spec["indexes"]:
+        conn.execute(text(f"CREATE INDEX ix_{table}_{column} ON {table} ({column})"))
+
+
+def partition_attendance_tables(conn):
+    """Convert attendance and attendance_overrides to monthly partitions (rewrites both tables)."""
+    for table in PARTITIONED_TABLES:
+        partition_table(conn, table)
+
+
+def export_partition(conn, qualified_name, export_dir):
+    """Write an archived partition to ``<export_dir>/<name>.csv.gz``; return the path."""
+    path = os.path.join(export_dir, f"{qualified_name.split('.')[-1]}.csv.gz")
+    cursor = conn.connection.cursor()
+    with gzip.open(path, "wt", encoding="utf-8") as handle:
+        cursor.copy_expert(f"COPY {qualified_name} TO STDOUT WITH (FORMAT csv, HEADER)", handle)
+    return path
+
+
+def archive_partitions(conn, before, export_dir=None, drop=False):
+    """Detach monthly partitions older than ``before`` into the archive schema.
+
+    Returns a list of ``(table name, rows, export path or None, dropped)``.
+    """
+    conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+    conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+    archived = []
+    for table in PARTITIONED_TABLES:
+        for month, name in sorted(month_partitions(conn, table).items()):
+            if month >= before:
+                continue
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+            qualified = f"{ARCHIVE_SCHEMA}.{name}"
+            foreign_keys = conn.execute(text("""
+                SELECT conname FROM pg_constraint
+                WHERE conrelid = CAST(:name AS regclass) AND contype = 'f'
+            """), {"name": qualified}).scalars().all()
+            for constraint in foreign_keys:
+                conn.execute(text(f"ALTER TABLE {qualified} DROP CONSTRAINT {constraint}"))
+            rows = conn.execute(text(f"SELECT count(*) FROM {qualified}")).scalar()
+            path = export_partition(conn, qualified, export_dir) if export_dir else None
+            if drop and path:
+                conn.execute(text(f"DROP TABLE {qualified}"))
+            archived.append((qualified, rows, path, bool(drop and path)))
+    return archived
+
+
+def list_partitions(conn):
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(conn, table):
+            print(f"{table}: not partitioned (python migrations.py --include 0005_partition_attendance)")
+            continue
+        print(f"{table}:")
+        for month, name in sorted(month_partitions(conn, table).items()):
+            rows = conn.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+            print(f"  {name:<36} {rows:>10} rows")
+        rows = conn.execute(text(f"SELECT count(*) FROM {table}_default")).scalar()
+        print(f"  {table + '_default':<36} {rows:>10} rows")
+    archived = conn.execute(text(
+        "SELECT table_name FROM information_schema.tables WHERE table_schema = :schema ORDER BY table_name"
+    ), {"schema": ARCHIVE_SCHEMA}).scalars().all()
+    if archived:
+        print(f"{ARCHIVE_SCHEMA}: {', '.join(archived)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage monthly attendance partitions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show partitions and row counts")
+    ensure = commands.add_parser("ensure", help="create partitions for the coming months")
+    ensure.add_argument("--months-ahead", type=int, default=3)
+    archive = commands.add_parser("archive", help="detach past months into the archive schema")
+    archive.add_argument("--before", required=True, help="first month to keep attached, e.g. 2025-06")
+    archive.add_argument("--export-dir", help="also write each archived month to <dir>/<name>.csv.gz")
+    archive.add_argument("--drop", action="store_true", help="drop archived tables once exported")
+    args = parser.parse_args(argv)
+
+    if args.command == "archive":
+        try:
+            before = parse_month(args.before)
+        except ValueError:
+            parser.error("--before must look like 2025-06")
+        if before > month_start(datetime.now(timezone.utc)):
+            parser.error("--before cannot be later than the current month")
+        if args.drop and not args.export_dir:
+            parser.error("--drop needs --export-dir so the data is kept somewhere")
+        if args.export_dir:
+            os.makedirs(args.export_dir, exist_ok=True)
+
+    database_url = get_database_url()
+    if not is_postgres(database_url):
+        print("⏭️  Partitioning is PostgreSQL-only; nothing to do for this database")
+        return
+
+    try:
+        # Without the app's DB_STATEMENT_TIMEOUT_MS: moving rows and exports can take a while
+        engine = create_db_engine(database_url, statement_timeout_ms=0)
+        with engine.begin() as conn:
+            conn.execute(text("SET LOCAL statement_timeout = 0"))
+            if args.command == "list":
+                list_partitions(conn)
+            elif args.command == "ensure":
+                created = ensure_partitions(conn, args.months_ahead)
+                for name in created:
+                    print(f"  ➕ {name}")
+                print(f"✅ {len(created)} partition(s) created")
+            else:
+                archived = archive_partitions(conn, before, args.export_dir, args.drop)
+                for name, rows, path, dropped in archived:
+                    note = f" -> {path}" if path else ""
+                    print(f"  📦 {name}: {rows} rows{note}{' (dropped)' if dropped else ''}")
+                print(f"✅ {len(archived)} partition(s) archived")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
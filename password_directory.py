@@ -0,0 +1,96 @@
+"""
+Paginated user lookup for the admin password page.
+
+Teachers and students are listed a page at a time (keyset order by role,
+name, id) and each page's most recent ``PasswordLog`` entries are fetched
+with a single ``row_number()`` window query, so the page costs the same few
+queries whatever the headcount.
+"""
+
+from sqlalchemy import func
+
+from models import db, User, ClassModel, PasswordLog
+from student_listing import keyset_page
+from student_search import escape_like
+
+PASSWORD_ROLES = ("teacher", "student")
+PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+
+def _sort_key():
+    return User.role, User.name, User.id
+
+
+def role_counts():
+    """``{role: number of users}`` for the password-managed roles, one GROUP BY."""
+    return dict(
+        db.session.query(User.role, func.count(User.id)).filter(
+            User.role.in_(PASSWORD_ROLES)
+        ).group_by(User.role).all()
+    )
+
+
+def latest_password_changes(user_ids):
+    """Map user id -> its most recent PasswordLog row, using one windowed query."""
+    if not user_ids:
+        return {}
+
+    ranked = db.session.query(
+        PasswordLog.user_id,
+        PasswordLog.action,
+        PasswordLog.method,
+        PasswordLog.timestamp,
+        func.row_number().over(
+            partition_by=PasswordLog.user_id,
+            order_by=(PasswordLog.timestamp.desc(), PasswordLog.id.desc()),
+        ).label("position"),
+    ).filter(PasswordLog.user_id.in_(user_ids)).subquery()
+
+    rows = db.session.query(
+        ranked.c.user_id, ranked.c.action, ranked.c.method, ranked.c.timestamp
+    ).filter(ranked.c.position == 1).all()
+    return {row.user_id: row for row in rows}
+
+
+def password_users_page(search="", role="", after=None, before=None, per_page=PER_PAGE):
+    """Return ``(page, users)`` where ``users`` are JSON-ready dicts for one page."""
+    query = db.session.query(
+        User.id, User.name, User.email, User.role, ClassModel.name.label("class_name")
+    ).outerjoin(ClassModel, User.class_id == ClassModel.id)
+
+    if role in PASSWORD_ROLES:
+        query = query.filter(User.role == role)
+    else:
+        query = query.filter(User.role.in_(PASSWORD_ROLES))
+
+    search = (search or "").strip()
+    if search:
+        pattern = f"%{escape_like(search)}%"
+        query = query.filter(
+            db.or_(
+                User.name.ilike(pattern, escape="\\"),
+                User.email.ilike(pattern, escape="\\"),
+            )
+        )
+
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    page = keyset_page(query, _sort_key(), after=after, before=before, per_page=per_page)
+    last_changes = latest_password_changes([row.id for row in page.items])
+
+    users = []
+    for row in page.items:
+        last_change = last_changes.get(row.id)
+        users.append({
+            'id': row.id,
+            'name': row.name,
+            'email': row.email,
+            'role': row.role,
+            'class_name': row.class_name,
+            'last_change': {
+                'timestamp': last_change.timestamp.isoformat(),
+                'action': last_change.action,
+                'method': last_change.method,
+            } if last_change else None,
+        })
+    return page, users
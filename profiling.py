@@ -0,0 +1,180 @@
+"""
+On-demand profiling of single requests.
+
+A request is profiled only when it carries ``?_profile=`` or an
+``X-Profile`` header, so ordinary requests pay one lookup and nothing else:
+
+- an admin can profile their own requests with ``?_profile=1``
+- to profile what a particular user sees (say, a teacher whose class
+  records page is slow), an admin creates a signed link on the Profiles
+  page; the token only works for that user and expires after
+  ``PROFILE_LINK_HOURS``
+
+The request runs under cProfile while its SQL statements are recorded on
+instrumented copies of the engines (see sql_instrumentation.py); requests
+that are not profiled never run those listeners. The result - top functions, who calls what, and the
+SQL timeline - is saved to ``PROFILE_DIR`` (shared by the workers of a host,
+newest ``PROFILE_KEEP`` kept) and shown at ``/admin/profiles``. The raw
+``.prof`` file opens in snakeviz, flameprof or gprof2dot for a flame graph.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, request
+from flask_login import current_user
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+import sql_instrumentation
+
+PROFILE_ARG = "_profile"
+PROFILE_HEADER = "X-Profile"
+TOP_FUNCTIONS = 60
+
+_PROFILE_ID = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$")
+
+
+def get_profile_dir(app):
+    profile_dir = app.config.get("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "attendance_profiles")
+    os.makedirs(profile_dir, exist_ok=True)
+    return profile_dir
+
+
+def _serializer(app):
+    return URLSafeTimedSerializer(app.secret_key, salt="request-profile")
+
+
+def make_link_token(app, user_id):
+    """Token that lets ``user_id`` profile their own requests until it expires."""
+    return _serializer(app).dumps({"user_id": user_id})
+
+
+def _profiling_allowed(app, value):
+    if not current_user.is_authenticated:
+        return False
+    if current_user.role == "admin":
+        return True
+    try:
+        payload = _serializer(app).loads(value, max_age=app.config["PROFILE_LINK_HOURS"] * 3600)
+    except BadSignature:
+        return False
+    return payload.get("user_id") == current_user.id
+
+
+def profile_path(app, profile_id, suffix):
+    """Path of a saved profile, or None for an id that is not one of ours."""
+    if not _PROFILE_ID.match(profile_id or ""):
+        return None
+    return os.path.join(get_profile_dir(app), f"{profile_id}{suffix}")
+
+
+def _stats_text(profiler, method, *args):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream).strip_dirs().sort_stats("cumulative")
+    getattr(stats, method)(*args)
+    return stream.getvalue()
+
+
+def save_profile(app, profiler, log, meta):
+    """Write the ``.prof`` dump and a JSON summary; return the profile id."""
+    profile_id = f"{datetime.now(timezone.utc):%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+    profiler.dump_stats(profile_path(app, profile_id, ".prof"))
+    summary = {
+        **meta,
+        "id": profile_id,
+        "sql_count": log.count,
+        "sql_ms": round(log.total_seconds * 1000, 2),
+        "sql": [
+            {"offset_ms": round(offset * 1000, 2), "duration_ms": round(duration * 1000, 2), "statement": statement}
+            for offset, duration, statement in log.queries
+        ],
+        "repeated": log.repeated(app.config["SQL_REPEAT_THRESHOLD"]),
+        "functions": _stats_text(profiler, "print_stats", TOP_FUNCTIONS),
+        "callees": _stats_text(profiler, "print_callees", TOP_FUNCTIONS // 3),
+    }
+    with open(profile_path(app, profile_id, ".json"), "w") as f:
+        json.dump(summary, f)
+    _prune(app)
+    return profile_id
+
+
+def _prune(app):
+    profile_dir = get_profile_dir(app)
+    summaries = sorted(name for name in os.listdir(profile_dir) if name.endswith(".json"))
+    for name in summaries[:-app.config["PROFILE_KEEP"]]:
+        for suffix in (".json", ".prof"):
+            try:
+                os.remove(os.path.join(profile_dir, name[:-len(".json")] + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def load_profile(app, profile_id):
+    path = profile_path(app, profile_id, ".json")
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def list_profiles(app):
+    """Saved profile summaries, newest first, without the heavy fields."""
+    profiles = []
+    for name in sorted(os.listdir(get_profile_dir(app)), reverse=True):
+        if name.endswith(".json"):
+            profile = load_profile(app, name[:-len(".json")])
+            if profile:
+                for key in ("sql", "functions", "callees"):
+                    profile.pop(key, None)
+                profiles.append(profile)
+    return profiles
+
+
+def init_app(app):
+    @app.before_request
+    def _start_profile():
+        value = request.args.get(PROFILE_ARG) or request.headers.get(PROFILE_HEADER)
+        if not value or not _profiling_allowed(app, value):
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this thread
+            return
+        # End the read-only transaction opened while checking access, so the
+        # session's next connection comes from the instrumented engines
+        app.extensions["sqlalchemy"].session.rollback()
+        g.sql_instrumented_engines = True
+        g.request_profile = (profiler, sql_instrumentation.start_log(), time.perf_counter())
+
+    @app.after_request
+    def _note_profile_status(response):
+        if "request_profile" in g:
+            g.request_profile_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_profile(exc):
+        if "request_profile" not in g:
+            return
+        profiler, log, started = g.pop("request_profile")
+        profiler.disable()
+        sql_instrumentation.stop_log(log)
+        save_profile(app, profiler, log, {
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "user": f"{current_user.name} ({current_user.role})",
+            "status": g.pop("request_profile_status", 500),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        })
@@ -0,0 +1,137 @@
+"""
+Set-based semester promotion.
+
+The current-class -> next-class mapping is built once from
+``(branch_id, division, semester number)`` and applied with a couple of bulk
+UPDATE statements, so promoting every student costs the same handful of
+queries whether there are 100 or 10,000 of them.
+"""
+
+from sqlalchemy import case, func
+
+from models import db, User, ClassModel, Semester
+
+FINAL_SEMESTER = 8
+
+
+class PromotionPlan:
+    """Per-class promotion targets plus the classes that cannot be promoted."""
+
+    def __init__(self):
+        self.rows = []  # One dict per class that has active students
+        self.class_map = {}  # current class id -> next class id
+        self.alumni_class_ids = set()
+        self.unmapped = []  # Rows whose students would be left where they are
+        self.students_without_class = 0
+
+    @property
+    def promoted_count(self):
+        return sum(row['students'] for row in self.rows if row['next_class_id'])
+
+    @property
+    def alumni_count(self):
+        return sum(row['students'] for row in self.rows if row['to_alumni'])
+
+    @property
+    def unmapped_count(self):
+        return sum(row['students'] for row in self.unmapped) + self.students_without_class
+
+    def errors(self):
+        """Human-readable reasons students will not be promoted."""
+        messages = [f"{row['students']} students in {row['class_name']}: {row['reason']}" for row in self.unmapped]
+        if self.students_without_class:
+            messages.append(f"{self.students_without_class} students have no class assigned")
+        return messages
+
+
+def _active_students():
+    return db.session.query(User).filter(User.role == "student", User.status == "Active")
+
+
+def build_promotion_plan(semester_number=None):
+    """Work out where every active student goes, using three queries in total.
+
+    With ``semester_number`` only classes in that semester are considered.
+    """
+    classes = db.session.query(
+        ClassModel.id, ClassModel.name, ClassModel.branch_id, ClassModel.division, Semester.number
+    ).outerjoin(Semester, ClassModel.semester_id == Semester.id).order_by(ClassModel.id).all()
+
+    # Lowest class id wins if two classes share a position, as .first() did before
+    by_position = {}
+    for class_id, name, branch_id, division, number in classes:
+        if number is not None:
+            by_position.setdefault((branch_id, division, number), (class_id, name))
+
+    counts = dict(
+        db.session.query(User.class_id, func.count(User.id)).filter(
+            User.role == "student", User.status == "Active"
+        ).group_by(User.class_id).all()
+    )
+
+    plan = PromotionPlan()
+    if semester_number is None:
+        plan.students_without_class = counts.get(None, 0)
+
+    for class_id, name, branch_id, division, number in classes:
+        students = counts.get(class_id, 0)
+        if not students or (semester_number is not None and number != semester_number):
+            continue
+
+        row = {
+            'class_id': class_id,
+            'class_name': name,
+            'semester': number,
+            'students': students,
+            'next_class_id': None,
+            'next_class_name': None,
+            'to_alumni': False,
+            'reason': None,
+        }
+        if number is None:
+            row['reason'] = "no semester assigned"
+        elif number >= FINAL_SEMESTER:
+            row['to_alumni'] = True
+            plan.alumni_class_ids.add(class_id)
+        else:
+            target = by_position.get((branch_id, division, number + 1))
+            if target:
+                row['next_class_id'], row['next_class_name'] = target
+                plan.class_map[class_id] = target[0]
+            else:
+                row['reason'] = f"no semester {number + 1} class with the same branch and division"
+
+        plan.rows.append(row)
+        if row['reason']:
+            plan.unmapped.append(row)
+
+    return plan
+
+
+def apply_promotion(plan, clear_alumni_class=True):
+    """Apply ``plan`` in one transaction and return the number of students changed.
+
+    Final-semester students become Alumni first (optionally leaving their
+    class), then every other mapped class moves in a single ``CASE`` UPDATE,
+    so nobody is promoted twice.
+    """
+    changed = 0
+    try:
+        if plan.alumni_class_ids:
+            values = {User.status: "Alumni"}
+            if clear_alumni_class:
+                values[User.class_id] = None
+            changed += _active_students().filter(
+                User.class_id.in_(plan.alumni_class_ids)
+            ).update(values, synchronize_session=False)
+
+        if plan.class_map:
+            changed += _active_students().filter(
+                User.class_id.in_(plan.class_map.keys())
+            ).update({User.class_id: case(plan.class_map, value=User.class_id)}, synchronize_session=False)
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return changed
@@ -0,0 +1,139 @@
+"""
+Optional read replica for dashboards and reports.
+
+With ``DATABASE_REPLICA_URL`` set, views wrapped in ``use_replica`` send
+their SELECTs to the replica engine (``db.engines["replica"]``). Everything
+else - attendance marking, review overrides, admin writes - stays on the
+primary, and so does any INSERT/UPDATE/DELETE or flush issued from a replica
+view.
+
+Freshness guard: before a request is routed, the replica's replay lag is
+checked (at most every ``REPLICA_LAG_CHECK_SECONDS`` per worker). If it is
+above ``REPLICA_MAX_LAG_SECONDS`` or the replica cannot be reached, the
+request reads from the primary instead.
+"""
+
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from db_engine import engine_options, normalize_database_url
+import metrics
+import sql_instrumentation
+
+BIND_KEY = "replica"
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", "10"))
+REPLICA_LAG_CHECK_SECONDS = float(os.environ.get("REPLICA_LAG_CHECK_SECONDS", "5"))
+
+# Zero when the replica has replayed everything it received (an idle primary
+# would otherwise look "late" by the time since its last write)
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+logger = logging.getLogger(__name__)
+
+_lag = {"checked_at": None, "seconds": None}
+_lag_lock = threading.Lock()
+
+
+def replica_url():
+    return normalize_database_url(os.environ.get("DATABASE_REPLICA_URL", "").strip()) or None
+
+
+def bind_config(database_url):
+    """``SQLALCHEMY_BINDS`` entries for the replica, empty when none is configured."""
+    if not database_url:
+        return {}
+    # The pool's logging name labels its checkout waits in metrics.py
+    return {BIND_KEY: {"url": database_url, **engine_options(database_url), "pool_logging_name": BIND_KEY}}
+
+
+def measure_lag(engine):
+    """Replica lag in seconds, or None if it could not be measured."""
+    if engine.dialect.name != "postgresql":
+        return 0.0
+    try:
+        with engine.connect() as conn:
+            return float(conn.execute(LAG_QUERY).scalar() or 0)
+    except Exception as e:
+        logger.warning("Replica lag check failed: %s", e)
+        return None
+
+
+def replica_lag(engine):
+    """Cached ``measure_lag`` result, refreshed every ``REPLICA_LAG_CHECK_SECONDS``."""
+    now = time.monotonic()
+    checked_at = _lag["checked_at"]
+    measured = False
+    if checked_at is None or now - checked_at > REPLICA_LAG_CHECK_SECONDS:
+        with _lag_lock:
+            if _lag["checked_at"] is None or now - _lag["checked_at"] > REPLICA_LAG_CHECK_SECONDS:
+                _lag["seconds"] = measure_lag(engine)
+                _lag["checked_at"] = time.monotonic()
+                measured = True
+    metrics.cache_lookup("replica_lag", not measured)
+    return _lag["seconds"]
+
+
+def fresh_replica(db):
+    """The replica engine if one is configured and within the lag threshold, else None."""
+    engine = db.engines.get(BIND_KEY)
+    if engine is None:
+        return None
+    lag = replica_lag(engine)
+    if lag is None or lag > REPLICA_MAX_LAG_SECONDS:
+        return None
+    return engine
+
+
+def status(db):
+    """Replica settings and last measured lag, for the admin pool endpoint."""
+    return {
+        "configured": BIND_KEY in db.engines,
+        "max_lag_seconds": REPLICA_MAX_LAG_SECONDS,
+        "lag_seconds": _lag["seconds"],
+    }
+
+
+def use_replica(view_func):
+    """Route the view's reads to the replica when it is fresh enough."""
+
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        # Decided once per request so one page never mixes replica and primary reads
+        g.read_replica = fresh_replica(current_app.extensions["sqlalchemy"])
+        return view_func(*args, **kwargs)
+
+    return wrapper
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends reads to the replica inside ``use_replica`` views.
+
+    In a profiled request every engine is swapped for its instrumented copy
+    (see sql_instrumentation.py).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = None
+        if bind is None and not self._flushing and has_app_context():
+            replica = g.get("read_replica")
+            if replica is not None and not (clause is not None and getattr(clause, "is_dml", False)):
+                engine = replica
+        if engine is None:
+            engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is None and isinstance(engine, Engine) and has_app_context() and g.get("sql_instrumented_engines"):
+            return sql_instrumentation.instrumented_copy(engine)
+        return engine
@@ -0,0 +1,81 @@
+"""
+Set-based roster maintenance for students.
+
+Bulk operations take a list of user ids and run a fixed number of statements
+over the whole list, with the ``role == "student"`` check inside the same
+statements, instead of loading and checking each user one by one.
+"""
+
+from sqlalchemy import select
+
+from models import db, User, Attendance, AttendanceOverride, PasswordLog, ClassModel
+
+
+def parse_ids(values):
+    """Turn form or JSON values into a set of ints, silently dropping bad ones."""
+    ids = set()
+    for value in values or []:
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+def _student_ids_subquery(ids):
+    return select(User.id).where(User.id.in_(ids), User.role == "student")
+
+
+def delete_students(student_ids):
+    """Delete students and the rows that reference them; return counts.
+
+    Four DELETE statements in one transaction regardless of how many ids are
+    passed. Ids that are not students are ignored.
+    """
+    ids = parse_ids(student_ids)
+    counts = {"deleted": 0, "attendance_deleted": 0}
+    if not ids:
+        return counts
+
+    students = _student_ids_subquery(ids)
+    try:
+        counts["attendance_deleted"] = Attendance.query.filter(
+            Attendance.user_id.in_(students)
+        ).delete(synchronize_session=False)
+        AttendanceOverride.query.filter(
+            AttendanceOverride.student_id.in_(students)
+        ).delete(synchronize_session=False)
+        PasswordLog.query.filter(
+            PasswordLog.user_id.in_(students)
+        ).delete(synchronize_session=False)
+        counts["deleted"] = User.query.filter(
+            User.id.in_(ids), User.role == "student"
+        ).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return counts
+
+
+def move_students(student_ids, new_class_id):
+    """Move students to ``new_class_id`` with one UPDATE; return the number moved.
+
+    Raises ``ValueError`` if the target class does not exist.
+    """
+    ids = parse_ids(student_ids)
+    new_class_id = int(new_class_id)
+    if not db.session.query(ClassModel.query.filter_by(id=new_class_id).exists()).scalar():
+        raise ValueError("Class not found.")
+    if not ids:
+        return 0
+
+    try:
+        moved = User.query.filter(
+            User.id.in_(ids), User.role == "student"
+        ).update({User.class_id: new_class_id}, synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return moved
@@ -0,0 +1,131 @@
+"""
+Slow-query recorder.
+
+Every statement sent through the app's engines is timed; one that takes
+``SLOW_QUERY_MS`` or longer is recorded with its SQL (bound values stay as
+placeholders), the shape of its parameters (names and types, never the
+values), its duration and the route that issued it. A sample of them
+(``SLOW_QUERY_EXPLAIN_RATE``) also gets ``EXPLAIN (ANALYZE off)`` on
+PostgreSQL, run on a separate cursor of the same connection, so the plan
+is the one that statement got without running the query again.
+
+Records go to a per-worker ring buffer of the last ``SLOW_QUERY_BUFFER``
+(shown at ``/admin/slow-queries``) and to the ``slow_queries`` logger as
+one JSON line each, for log shipping across workers and hosts.
+``SLOW_QUERY_MS=0`` turns the recorder off.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+_buffer = deque(maxlen=200)
+_buffer_lock = threading.Lock()
+
+
+def parameter_shape(parameters, executemany=False):
+    """Names and types of the bound parameters, without their values."""
+    if executemany:
+        rows = list(parameters or [])
+        return f"{len(rows)} rows of {parameter_shape(rows[0]) if rows else '{}'}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def _route():
+    if has_request_context():
+        return f"{request.method} {request.endpoint or request.path}"
+    return "background"
+
+
+def explain(cursor, statement, parameters):
+    """Plan text for ``statement`` from a fresh cursor on the same DBAPI connection."""
+    dbapi_connection = cursor.connection
+    explain_cursor = dbapi_connection.cursor()
+    # A failing EXPLAIN must not abort the request's transaction
+    savepoint = not getattr(dbapi_connection, "autocommit", False)
+    try:
+        if savepoint:
+            explain_cursor.execute("SAVEPOINT slow_query_explain")
+        explain_cursor.execute(f"EXPLAIN (ANALYZE off) {statement}", parameters)
+        plan = "\n".join(row[0] for row in explain_cursor.fetchall())
+        if savepoint:
+            explain_cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    except Exception as e:
+        if savepoint:
+            explain_cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+        return f"EXPLAIN failed: {e}"
+    finally:
+        explain_cursor.close()
+
+
+def recent():
+    """Recorded slow queries in this worker, newest first."""
+    with _buffer_lock:
+        return list(reversed(_buffer))
+
+
+def record(entry):
+    with _buffer_lock:
+        _buffer.append(entry)
+    logger.warning(json.dumps({"event": "slow_query", **entry}, default=str))
+
+
+def init_app(app, db):
+    """Time the statements of every app engine against ``SLOW_QUERY_MS``."""
+    threshold = app.config["SLOW_QUERY_MS"] / 1000
+    if threshold <= 0:
+        return
+    explain_rate = app.config["SLOW_QUERY_EXPLAIN_RATE"]
+    global _buffer
+    _buffer = deque(maxlen=app.config["SLOW_QUERY_BUFFER"])
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started_stack = conn.info.get("slow_query_started")
+        if not started_stack:
+            return
+        duration = time.perf_counter() - started_stack.pop()
+        if duration < threshold:
+            return
+        plan = None
+        if (conn.dialect.name == "postgresql" and not executemany
+                and explain_rate and random.random() < explain_rate):
+            plan = explain(cursor, statement, parameters)
+        record({
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "duration_ms": round(duration * 1000, 1),
+            "route": _route(),
+            "statement": statement,
+            "parameters": parameter_shape(parameters, executemany),
+            "plan": plan,
+            "pid": os.getpid(),
+        })
+
+    def _handle_error(exception_context):
+        # A failed statement never reaches after_cursor_execute
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("slow_query_started"):
+            connection.info["slow_query_started"].pop()
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+            event.listen(engine, "handle_error", _handle_error)
@@ -0,0 +1,236 @@
+"""
+Opt-in per-request SQL instrumentation.
+
+With ``SQL_INSTRUMENTATION`` set to ``log`` or ``headers``, every statement
+sent through the app's engines is recorded for the request that issued it:
+query count, total database time, and how often each statement *shape*
+(the SQL with literals and bound values replaced by ``?``) was run. A shape
+repeated ``SQL_REPEAT_THRESHOLD`` times in one request is almost always an
+N+1 - a lazy load in a template loop or a query per student - and is logged
+as a warning with the statement.
+
+- ``log``: one summary line per request (INFO) plus the warnings
+- ``headers``: also ``X-SQL-Queries``, ``X-SQL-Time-Ms`` and
+  ``X-SQL-Repeated`` on every response, for the browser's network tab in dev
+
+``SQL_QUERY_BUDGET`` flags requests issuing more queries than that; under
+``app.testing`` the request raises ``QueryBudgetExceeded`` instead. Tests
+can also bound a block of requests with ``query_budget``::
+
+    with sql_instrumentation.query_budget(app, 15):
+        client.get("/teacher/class/1/records")
+
+When the setting is ``off`` (the default) no listener is attached at all.
+Profiled requests (profiling.py) set ``g.sql_instrumented_engines`` and the
+session then runs them on ``instrumented_copy`` engines, which share the
+pool but carry the listeners themselves, so other requests never run them.
+"""
+
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, request
+from sqlalchemy import event
+
+MODES = ("off", "log", "headers")
+
+# Bound values (%(name)s, %s, :name, ?), then literals, then IN (...) lists
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|(?<![:\w]):\w+|\?")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+_local = threading.local()
+
+_copies = {}  # engine -> instrumented copy
+_copies_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request or ``query_budget`` block ran more queries than allowed."""
+
+
+def statement_shape(statement):
+    """``statement`` with values replaced by ``?`` so repeats of one query compare equal."""
+    shape = _PLACEHOLDER.sub("?", statement)
+    shape = _STRING.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _VALUE_LIST.sub("(...)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class QueryLog:
+    """Statements recorded while the log is active on this thread."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []  # (seconds since start, duration, statement)
+
+    def record(self, started, duration, statement):
+        self.queries.append((started - self.started, duration, statement))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_seconds(self):
+        return sum(duration for _, duration, _ in self.queries)
+
+    def repeated(self, threshold):
+        """``(shape, count)`` for shapes run at least ``threshold`` times, most frequent first."""
+        counts = Counter(statement_shape(statement) for _, _, statement in self.queries)
+        return [(shape, count) for shape, count in counts.most_common() if count >= threshold]
+
+
+def _active_logs():
+    logs = getattr(_local, "logs", None)
+    if logs is None:
+        logs = _local.logs = []
+    return logs
+
+
+def start_log():
+    """Start recording this thread's statements into a new ``QueryLog``."""
+    log = QueryLog()
+    _active_logs().append(log)
+    return log
+
+
+def stop_log(log):
+    logs = _active_logs()
+    if log in logs:
+        logs.remove(log)
+
+
+@contextmanager
+def collect():
+    """Record every statement this thread runs inside the block into a ``QueryLog``."""
+    log = start_log()
+    try:
+        yield log
+    finally:
+        stop_log(log)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_local, "logs", None):
+        conn.info.setdefault("sql_instrumentation_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_stack = conn.info.get("sql_instrumentation_started")
+    if not started_stack:
+        return
+    # Popped even if the log stopped since the statement began
+    started = started_stack.pop()
+    duration = time.perf_counter() - started
+    for log in getattr(_local, "logs", None) or ():
+        log.record(started, duration, statement)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("sql_instrumentation_started"):
+        connection.info["sql_instrumentation_started"].pop()
+
+
+def instrument_engine(engine):
+    """Attach the timing listeners to ``engine`` (once)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+    return engine
+
+
+def instrumented_copy(engine):
+    """A copy of ``engine`` sharing its pool, with the timing listeners attached to the copy only."""
+    copy = _copies.get(engine)
+    if copy is None:
+        with _copies_lock:
+            copy = _copies.get(engine)
+            if copy is None:
+                # execution_options() returns an engine whose own listeners do
+                # not reach the original; it still runs the original's listeners
+                copy = _copies[engine] = instrument_engine(engine.execution_options())
+    return copy
+
+
+def instrument_app_engines(app):
+    with app.app_context():
+        for engine in app.extensions["sqlalchemy"].engines.values():
+            instrument_engine(engine)
+
+
+def _describe(log, threshold):
+    lines = [f"{log.count} queries, {log.total_seconds * 1000:.1f} ms in the database"]
+    for shape, count in log.repeated(threshold):
+        lines.append(f"  {count}x {shape}")
+    return "\n".join(lines)
+
+
+@contextmanager
+def query_budget(app, max_queries):
+    """Raise ``QueryBudgetExceeded`` if the block runs more than ``max_queries`` statements."""
+    instrument_app_engines(app)
+    with collect() as log:
+        yield log
+    if log.count > max_queries:
+        raise QueryBudgetExceeded(
+            f"{log.count} queries (budget {max_queries}): "
+            f"{_describe(log, app.config['SQL_REPEAT_THRESHOLD'])}"
+        )
+
+
+def init_app(app):
+    """Instrument the app's engines and requests according to ``SQL_INSTRUMENTATION``."""
+    mode = app.config["SQL_INSTRUMENTATION"]
+    if mode not in MODES:
+        raise ValueError(f"SQL_INSTRUMENTATION must be one of {', '.join(MODES)}, got {mode!r}")
+    if mode == "off":
+        return
+
+    instrument_app_engines(app)
+
+    @app.before_request
+    def _start_sql_log():
+        g.sql_log = start_log()
+
+    @app.after_request
+    def _report_sql_log(response):
+        log = g.get("sql_log")
+        if log is None:
+            return response
+        threshold = current_app.config["SQL_REPEAT_THRESHOLD"]
+        budget = current_app.config["SQL_QUERY_BUDGET"]
+        repeated = log.repeated(threshold)
+        where = f"{request.method} {request.path}"
+
+        current_app.logger.info(
+            f"{where} {response.status_code}: {log.count} queries, {log.total_seconds * 1000:.1f} ms"
+        )
+        for shape, count in repeated:
+            current_app.logger.warning(f"Possible N+1 in {where}: {count}x {shape}")
+        if budget and log.count > budget:
+            message = f"{where} ran {log.count} queries (budget {budget})"
+            if current_app.testing:
+                raise QueryBudgetExceeded(f"{message}: {_describe(log, threshold)}")
+            current_app.logger.warning(message)
+
+        if mode == "headers":
+            response.headers["X-SQL-Queries"] = str(log.count)
+            response.headers["X-SQL-Time-Ms"] = f"{log.total_seconds * 1000:.1f}"
+            response.headers["X-SQL-Repeated"] = str(len(repeated))
+        return response
+
+    @app.teardown_request
+    def _stop_sql_log(exc):
+        log = g.pop("sql_log", None)
+        if log is not None:
+            stop_log(log)
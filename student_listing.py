@@ -0,0 +1,122 @@
+"""
+Keyset-paginated student listing for the admin pages.
+
+Pages are ordered by ``(class, roll number, id)`` and fetched with a row
+comparison against the last row of the previous page instead of an OFFSET,
+so page 500 costs the same as page 1. The ordering matches the
+``ix_users_student_listing`` index. Only the columns the student table
+renders are selected, with the class name joined in.
+"""
+
+from sqlalchemy import func, tuple_
+
+from models import db, User, ClassModel
+
+PER_PAGE = 20
+
+
+def _sort_key():
+    # NULLs would drop out of a row comparison, so they sort as 0 / ''
+    return func.coalesce(User.class_id, 0), func.coalesce(User.roll_number, ""), User.id
+
+
+def listing_query():
+    """Students with just the columns shown in the student table."""
+    return db.session.query(
+        User.id,
+        User.name,
+        User.email,
+        User.roll_number,
+        User.is_active,
+        User.created_at,
+        User.class_id,
+        ClassModel.name.label("class_name"),
+    ).outerjoin(ClassModel, User.class_id == ClassModel.id).filter(User.role == "student")
+
+
+class KeysetPage:
+    """One page of rows plus the id cursors for the neighbouring pages."""
+
+    def __init__(self, items, has_prev, has_next):
+        self.items = items
+        self.has_prev = has_prev
+        self.has_next = has_next
+
+    @property
+    def prev_cursor(self):
+        return self.items[0].id if self.has_prev and self.items else None
+
+    @property
+    def next_cursor(self):
+        return self.items[-1].id if self.has_next and self.items else None
+
+
+def _parse_cursor(value):
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def keyset_page(query, sort_key, after=None, before=None, per_page=PER_PAGE):
+    """Return the page of ``query`` ordered by ``sort_key`` after (or before) the user with that id.
+
+    ``sort_key`` is a tuple of columns ending in ``User.id``; the cursor row's
+    values are looked up by id, so cursors stay plain integers in URLs.
+    """
+    after, before = _parse_cursor(after), _parse_cursor(before)
+    cursor_id = before or after
+
+    cursor = None
+    if cursor_id:
+        cursor = db.session.query(*sort_key).filter(User.id == cursor_id).first()
+
+    backwards = cursor is not None and before is not None
+    if cursor is not None:
+        if backwards:
+            query = query.filter(tuple_(*sort_key) < tuple_(*cursor))
+        else:
+            query = query.filter(tuple_(*sort_key) > tuple_(*cursor))
+
+    order = [column.desc() for column in sort_key] if backwards else list(sort_key)
+    rows = query.order_by(*order).limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if backwards:
+        rows.reverse()
+        return KeysetPage(rows, has_prev=more, has_next=True)
+    return KeysetPage(rows, has_prev=cursor is not None, has_next=more)
+
+
+def student_page(query, after=None, before=None, per_page=PER_PAGE):
+    """Return the page of student ``query`` after (or before) the student with that id."""
+    return keyset_page(query, _sort_key(), after=after, before=before, per_page=per_page)
+
+
+def student_counts():
+    """Per-class student counts and active/inactive totals from one GROUP BY.
+
+    Returns ``(class_stats, totals)`` where ``class_stats`` maps class id to
+    its number of students and ``totals`` maps class id (``None`` for
+    students without a class) to ``{"active": n, "inactive": n}``.
+    """
+    rows = db.session.query(User.class_id, User.is_active, func.count(User.id)).filter(
+        User.role == "student"
+    ).group_by(User.class_id, User.is_active).all()
+
+    class_stats = {}
+    totals = {}
+    for class_id, is_active, count in rows:
+        class_stats[class_id] = class_stats.get(class_id, 0) + count
+        bucket = totals.setdefault(class_id, {"active": 0, "inactive": 0})
+        bucket["active" if is_active else "inactive"] += count
+    return class_stats, totals
+
+
+def summarize(totals, class_id=None):
+    """Collapse ``student_counts()`` totals to one ``{"total", "active", "inactive"}`` dict."""
+    buckets = [totals.get(class_id, {})] if class_id else totals.values()
+    active = sum(bucket.get("active", 0) for bucket in buckets)
+    inactive = sum(bucket.get("inactive", 0) for bucket in buckets)
+    return {"total": active + inactive, "active": active, "inactive": inactive}
@@ -0,0 +1,150 @@
+"""
+Fast student search for the admin pages.
+
+Roll numbers are matched against an in-memory, sorted prefix index held by
+each worker, so the common "type the start of a roll number" lookup never
+touches the database. Name and email matches use ``LIKE 'term%'`` and
+``ILIKE '%term%'`` with a ``LIMIT``, which on PostgreSQL are served by the
+prefix and trigram indexes created by ``migrate_search_indexes.py``.
+
+The roll number index is rebuilt lazily: after ``ROLL_INDEX_TTL`` seconds, or
+straight away once ``invalidate_roll_index()`` is called after a roster write
+in this worker.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import func
+
+import metrics
+from models import db, User, ClassModel
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+ROLL_INDEX_TTL = int(os.environ.get("STUDENT_SEARCH_INDEX_TTL", "60"))
+
+
+class RollNumberIndex:
+    """Sorted ``(lowercase roll number, user id)`` pairs searched with bisect."""
+
+    def __init__(self, entries):
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.ids = [user_id for _, user_id in entries]
+        self.built_at = time.monotonic()
+
+    def prefix(self, term, limit):
+        """Ids of students whose roll number starts with ``term``, in roll number order."""
+        term = term.lower()
+        matches = []
+        position = bisect_left(self.keys, term)
+        while position < len(self.keys) and len(matches) < limit and self.keys[position].startswith(term):
+            matches.append(self.ids[position])
+            position += 1
+        return matches
+
+
+_roll_index = None
+_roll_index_lock = threading.Lock()
+
+
+def _build_roll_index():
+    rows = db.session.query(User.roll_number, User.id).filter(
+        User.role == "student", User.roll_number.isnot(None), User.roll_number != ""
+    ).all()
+    return RollNumberIndex([(roll_number.lower(), user_id) for roll_number, user_id in rows])
+
+
+def get_roll_index():
+    """Return this worker's roll number index, rebuilding it when stale."""
+    global _roll_index
+    index = _roll_index
+    rebuilt = False
+    if index is None or time.monotonic() - index.built_at > ROLL_INDEX_TTL:
+        with _roll_index_lock:
+            index = _roll_index
+            if index is None or time.monotonic() - index.built_at > ROLL_INDEX_TTL:
+                index = _roll_index = _build_roll_index()
+                rebuilt = True
+    metrics.cache_lookup("roll_index", not rebuilt)
+    return index
+
+
+def invalidate_roll_index():
+    """Drop the roll number index so the next search rebuilds it."""
+    global _roll_index
+    _roll_index = None
+
+
+def escape_like(term):
+    """Escape LIKE wildcards so user input is matched literally."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_students(term, limit=DEFAULT_LIMIT, class_id=None):
+    """Return up to ``limit`` student dicts matching ``term``, best matches first.
+
+    Order: roll number prefix, then name/email prefix, then name/email
+    substring (only for terms of three or more characters, which is what
+    the trigram index can serve).
+    """
+    term = (term or "").strip()
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    if not term:
+        return []
+
+    def students():
+        query = db.session.query(
+            User.id, User.name, User.email, User.roll_number, ClassModel.name
+        ).outerjoin(ClassModel, User.class_id == ClassModel.id).filter(User.role == "student")
+        if class_id:
+            query = query.filter(User.class_id == class_id)
+        return query
+
+    found = {}
+
+    # With a class filter, over-fetch so matches in other classes do not crowd out the limit
+    roll_ids = get_roll_index().prefix(term, limit * 5 if class_id else limit)
+    if roll_ids:
+        rows = {row[0]: row for row in students().filter(User.id.in_(roll_ids)).all()}
+        for user_id in roll_ids:
+            if user_id in rows and len(found) < limit:
+                found[user_id] = rows[user_id]
+
+    pattern = escape_like(term.lower())
+    if len(found) < limit:
+        prefix_rows = students().filter(
+            db.or_(
+                func.lower(User.name).like(f"{pattern}%", escape="\\"),
+                func.lower(User.email).like(f"{pattern}%", escape="\\"),
+            ),
+            User.id.notin_(found.keys()),
+        ).order_by(User.name).limit(limit - len(found)).all()
+        for row in prefix_rows:
+            found[row[0]] = row
+
+    if len(found) < limit and len(term) >= 3:
+        contains_rows = students().filter(
+            db.or_(
+                User.name.ilike(f"%{pattern}%", escape="\\"),
+                User.email.ilike(f"%{pattern}%", escape="\\"),
+                User.roll_number.ilike(f"%{pattern}%", escape="\\"),
+            ),
+            User.id.notin_(found.keys()),
+        ).order_by(User.name).limit(limit - len(found)).all()
+        for row in contains_rows:
+            found[row[0]] = row
+
+    return [
+        {
+            'id': user_id,
+            'name': name,
+            'email': email,
+            'roll_number': roll_number,
+            'class_name': class_name,
+        }
+        for user_id, name, email, roll_number, class_name in found.values()
+    ]
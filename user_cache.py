@@ -0,0 +1,122 @@
+"""
+Per-worker cache for the Flask-Login user loader.
+
+``load_user`` runs on every authenticated request, including each QR scan
+and Wi-Fi status poll. Instead of loading the whole ``User`` row each time,
+the identity fields (id, role, class_id, department_id, name, is_active) are
+cached for ``USER_CACHE_TTL`` seconds and wrapped in a ``CachedUser`` per
+request.
+Any other attribute (``class_obj``, ``email``, ``status`` ...) loads the full
+ORM object on first access, once per request.
+
+Entries are dropped after a commit that changed or deleted a user, through
+the ORM (``user.name = ...``) or a bulk ``UPDATE``/``DELETE`` on ``users``.
+Other workers see the change once their entry expires.
+"""
+
+import os
+import threading
+import time
+
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import metrics
+from models import db, User
+
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "30"))
+
+_cache = {}  # user id -> (expires_at, identity tuple)
+_lock = threading.Lock()
+
+
+class CachedUser(UserMixin):
+    """Identity fields of a user; anything else is read from the full ORM object."""
+
+    def __init__(self, id, role, class_id, department_id, name, is_active):
+        self.id = id
+        self.role = role
+        self.class_id = class_id
+        self.department_id = department_id
+        self.name = name
+        self._is_active = is_active
+        self._user = None
+
+    @property
+    def is_active(self):
+        # UserMixin's version is always True; this is the users.is_active column
+        return self._is_active
+
+    @property
+    def user(self):
+        """The full ``User`` row, loaded on first use."""
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        # Only called for attributes not set above
+        if name.startswith("__") or name == "_user":
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+
+def load(user_id):
+    """Return a ``CachedUser`` for ``user_id``, or None if there is no such user."""
+    now = time.monotonic()
+    entry = _cache.get(user_id)
+    if entry is None or entry[0] < now:
+        metrics.cache_lookup("user", False)
+        identity = db.session.query(
+            User.id, User.role, User.class_id, User.department_id, User.name, User.is_active
+        ).filter(User.id == user_id).first()
+        if identity is None:
+            _cache.pop(user_id, None)
+            return None
+        entry = (now + USER_CACHE_TTL, tuple(identity))
+        with _lock:
+            _cache[user_id] = entry
+    else:
+        metrics.cache_lookup("user", True)
+    return CachedUser(*entry[1])
+
+
+def invalidate(user_id=None):
+    """Drop one user's entry, or every entry when ``user_id`` is None."""
+    with _lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(user_id, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = session.info.setdefault("changed_user_ids", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            changed.add(obj.id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_user_writes(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and \
+            orm_execute_state.bind_mapper is not None and orm_execute_state.bind_mapper.class_ is User:
+        orm_execute_state.session.info["all_users_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("all_users_changed", False):
+        session.info.pop("changed_user_ids", None)
+        invalidate()
+        return
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session):
+    session.info.pop("all_users_changed", None)
+    session.info.pop("changed_user_ids", None)
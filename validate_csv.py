@@ -84,11 +84,42 @@ def validate_csv_file(filename):
         print(f"❌ Error reading CSV file: {e}")
         return False
 
+def validate_against_database(filename):
+    """Dry-run the file against the database (duplicates, unknown classes)."""
+    from app import create_app
+    import csv_import
+    
+    print(f"\n🗄️  Checking {filename} against the database...")
+    app = create_app()
+    with app.app_context():
+        with open(filename, 'rb') as f:
+            try:
+                reader = csv_import.open_csv_reader(f, csv_import.STUDENT_REQUIRED_COLUMNS)
+            except csv_import.CSVFormatError as e:
+                print(f"❌ {e}")
+                return False
+            result = csv_import.validate_students(reader)
+    
+    for row_num, message in result.errors:
+        print(f"⚠️  Row {row_num}: {message}")
+    print(f"📊 {result.processed - result.failed} of {result.processed} rows can be imported")
+    return result.failed == 0
+
 if __name__ == "__main__":
+    import sys
+    
     print("🔍 Enhanced CSV Validation")
     print("=" * 50)
     
-    if validate_csv_file('test_students.csv'):
+    # Usage: python validate_csv.py [file.csv] [--database]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    filename = args[0] if args else 'test_students.csv'
+    
+    is_valid = validate_csv_file(filename)
+    if is_valid and '--database' in sys.argv:
+        is_valid = validate_against_database(filename)
+    
+    if is_valid:
         print("\n🎉 Your CSV file is ready for bulk import!")
         print("\n📝 Next steps:")
         print("1. Go to Admin Setup page")
@@ -0,0 +1,200 @@
+"""
+Precompiled matcher for Wi-Fi verification.
+
+Active ``WiFiNetwork`` rows and the ``WIFI_ALLOWED_CIDRS`` networks are
+compiled once per worker into sorted, non-overlapping integer ranges (one
+table per IP version). A lookup is a single ``bisect`` with no database
+query and no ``ipaddress.ip_network`` parsing.
+
+The compiled matcher is rebuilt when ``invalidate()`` is called, which
+``manage_wifi_networks`` does after adding, toggling or deleting a network.
+Other workers notice the change with a cheap check, at most every
+``WIFI_MATCHER_CHECK_SECONDS``, of the active network ids (rows are only
+added, toggled or deleted, never edited). ``WIFI_MATCHER_TTL`` forces a
+full rebuild regardless.
+"""
+
+import hashlib
+import heapq
+import ipaddress
+import os
+import threading
+import time
+from bisect import bisect_right
+from collections import namedtuple
+
+import metrics
+from models import WiFiNetwork
+
+# Values of WIFI_ENFORCEMENT (see create_app)
+ENFORCEMENT_MODES = ("off", "record", "enforce")
+
+MATCHER_TTL = int(os.environ.get("WIFI_MATCHER_TTL", "300"))
+# How often a worker compares its matcher against the active network ids
+MATCHER_CHECK_INTERVAL = float(os.environ.get("WIFI_MATCHER_CHECK_SECONDS", "5"))
+
+# Plain copy of the columns callers use, safe to share between requests
+WiFiNetworkInfo = namedtuple("WiFiNetworkInfo", "id name router_ip subnet_mask")
+
+
+def parse_wifi_network(router_ip, subnet_mask):
+    """Network covered by a router IP and optional mask ("255.255.255.0" or "/24").
+
+    Without a mask the router's /24 is used. Raises ``ValueError`` if invalid.
+    """
+    if subnet_mask:
+        if subnet_mask.startswith('/'):
+            return ipaddress.ip_network(f"{router_ip}{subnet_mask}", strict=False)
+        return ipaddress.ip_network(f"{router_ip}/{subnet_mask}", strict=False)
+    return ipaddress.ip_network(f"{router_ip}/24", strict=False)
+
+
+def parse_client_ip(ip_str):
+    """Parse a client IP, unwrapping IPv4-mapped IPv6. Returns None if invalid."""
+    if not ip_str:
+        return None
+    try:
+        ip_obj = ipaddress.ip_address(ip_str)
+    except ValueError:
+        return None
+    if isinstance(ip_obj, ipaddress.IPv6Address) and ip_obj.ipv4_mapped:
+        ip_obj = ip_obj.ipv4_mapped
+    return ip_obj
+
+
+class _RangeTable:
+    """Disjoint ``[start, end]`` integer ranges for one IP version, searched with bisect."""
+
+    def __init__(self, ranges):
+        # ranges: (start, end, priority, wifi network or None); a None network
+        # marks an allowed CIDR. Overlaps are flattened so each segment keeps
+        # the best (lowest priority) Wi-Fi network and whether a CIDR covers it.
+        boundaries = sorted({start for start, _, _, _ in ranges} | {end + 1 for _, end, _, _ in ranges})
+        by_start = sorted(ranges, key=lambda r: r[0])
+        self.starts = []
+        self.ends = []
+        self.values = []
+
+        active_wifi = []  # heap of (priority, end, network)
+        active_cidr_ends = []  # heap of ends
+        position = 0
+        for index, point in enumerate(boundaries[:-1]):
+            while position < len(by_start) and by_start[position][0] == point:
+                start, end, priority, network = by_start[position]
+                if network is None:
+                    heapq.heappush(active_cidr_ends, end)
+                else:
+                    heapq.heappush(active_wifi, (priority, end, network))
+                position += 1
+            while active_cidr_ends and active_cidr_ends[0] < point:
+                heapq.heappop(active_cidr_ends)
+            # Expired Wi-Fi ranges only matter once they reach the top of the heap
+            while active_wifi and active_wifi[0][1] < point:
+                heapq.heappop(active_wifi)
+
+            wifi = active_wifi[0][2] if active_wifi else None
+            allowed = bool(active_cidr_ends)
+            if wifi is None and not allowed:
+                continue
+            segment_end = boundaries[index + 1] - 1
+            if self.values and self.ends[-1] == point - 1 and self.values[-1] == (wifi, allowed):
+                self.ends[-1] = segment_end
+            else:
+                self.starts.append(point)
+                self.ends.append(segment_end)
+                self.values.append((wifi, allowed))
+
+    def lookup(self, value):
+        index = bisect_right(self.starts, value) - 1
+        if index >= 0 and value <= self.ends[index]:
+            return self.values[index]
+        return None, False
+
+
+class NetworkMatcher:
+    """Compiled Wi-Fi networks plus allowed CIDRs."""
+
+    def __init__(self, wifi_networks, allowed_networks):
+        ranges = {4: [], 6: []}
+        for network in allowed_networks:
+            ranges[network.version].append(
+                (int(network.network_address), int(network.broadcast_address), None, None)
+            )
+        for info in wifi_networks:
+            try:
+                network = parse_wifi_network(info.router_ip, info.subnet_mask)
+            except ValueError:
+                continue
+            # Same precedence as the old per-row loop: the first active network by id
+            ranges[network.version].append(
+                (int(network.network_address), int(network.broadcast_address), info.id, info)
+            )
+        self.tables = {ip_version: _RangeTable(items) for ip_version, items in ranges.items()}
+        self.network_count = len(wifi_networks)
+        self.network_ids = tuple(info.id for info in wifi_networks)
+        # Same networks give the same fingerprint in every worker (used for ETags)
+        config = repr((sorted(wifi_networks), sorted(str(network) for network in allowed_networks)))
+        self.fingerprint = hashlib.sha1(config.encode()).hexdigest()[:16]
+        self.built_at = self.checked_at = time.monotonic()
+
+    def match(self, ip_str):
+        """Return ``(wifi_network_info or None, on_allowed_cidr)`` for a client IP."""
+        ip_obj = parse_client_ip(ip_str)
+        if ip_obj is None:
+            return None, False
+        return self.tables[ip_obj.version].lookup(int(ip_obj))
+
+
+def load_active_networks():
+    rows = WiFiNetwork.query.with_entities(
+        WiFiNetwork.id, WiFiNetwork.name, WiFiNetwork.router_ip, WiFiNetwork.subnet_mask
+    ).filter_by(is_active=True).order_by(WiFiNetwork.id).all()
+    return [WiFiNetworkInfo(*row) for row in rows]
+
+
+def load_active_network_ids():
+    rows = WiFiNetwork.query.with_entities(WiFiNetwork.id).filter_by(is_active=True).order_by(WiFiNetwork.id)
+    return tuple(network_id for (network_id,) in rows)
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def _fresh(matcher, now):
+    """Whether ``matcher`` can be used without checking the database."""
+    return (matcher is not None and now - matcher.built_at <= MATCHER_TTL
+            and now - matcher.checked_at <= MATCHER_CHECK_INTERVAL)
+
+
+def _is_current(matcher, now):
+    """Whether ``matcher`` may still be used, checking the database if it is due."""
+    if matcher is None or now - matcher.built_at > MATCHER_TTL:
+        return False
+    if now - matcher.checked_at > MATCHER_CHECK_INTERVAL:
+        # Another worker may have changed the networks since this one was built
+        if load_active_network_ids() != matcher.network_ids:
+            return False
+        matcher.checked_at = now
+    return True
+
+
+def get_matcher(allowed_networks):
+    """Return this worker's compiled matcher, building it on first use or when stale."""
+    global _matcher
+    matcher = _matcher
+    rebuilt = False
+    if not _fresh(matcher, time.monotonic()):
+        with _matcher_lock:
+            matcher = _matcher
+            if not _is_current(matcher, time.monotonic()):
+                matcher = _matcher = NetworkMatcher(load_active_networks(), allowed_networks)
+                rebuilt = True
+    metrics.cache_lookup("wifi_matcher", not rebuilt)
+    return matcher
+
+
+def invalidate():
+    """Drop the compiled matcher after a Wi-Fi network change."""
+    global _matcher
+    _matcher = None